@@ -4,30 +4,85 @@ Provides API endpoints for indexing websites and querying content with enhanced
 """
 
 import os
+import json
+import time
 import logging
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Literal
 import asyncio
+from collections import OrderedDict
+from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks, Query, Request
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Query, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, HTMLResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, HTMLResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel, HttpUrl
 
 from src.rag_engine import RAGEngine
+from src.gemini_client import EMPTY_RESPONSE_MESSAGE, ERROR_RESPONSE_MESSAGE
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build the worker's RAG engine before serving requests and close it on shutdown."""
+    # Built once here rather than on first use, so concurrent first requests can't
+    # race to open the stores and model warmup doesn't land on a user request
+    app.state.rag_engine = create_rag_engine()
+    try:
+        yield
+    finally:
+        await app.state.rag_engine.close()
+
 # Initialize FastAPI app
 app = FastAPI(
     title="RAG Website Chatbot API",
     description="API for indexing websites and querying content using RAG with image support",
-    version="1.1.0"
+    version="1.1.0",
+    lifespan=lifespan
 )
 
+class UnexpectedErrorMiddleware:
+    """Log unexpected endpoint errors once, with traceback, and answer with a 500.
+    
+    An ``exception_handler(Exception)`` would not do: Starlette's
+    ServerErrorMiddleware re-raises after calling it, so uvicorn logs the
+    same error again. Here the error is handled and not propagated.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        response_started = False
+        
+        async def send_wrapper(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as exc:
+            # Once headers are out, a 500 can't be sent; let the server abort the response
+            if response_started:
+                raise
+            logger.error(f"Error handling {scope['method']} {scope['path']}: {exc}", exc_info=exc)
+            response = JSONResponse(status_code=500, content={"detail": str(exc)})
+            await response(scope, receive, send)
+
+# Added first so error responses still pass through CORS and gzip
+app.add_middleware(UnexpectedErrorMiddleware)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -37,18 +92,101 @@ app.add_middleware(
     allow_headers=["*"],  # Allow all headers
 )
 
+# Compress larger responses such as image listings and stats
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
 # Get application base URL from environment or use default
 base_url = os.getenv("BASE_URL", "http://localhost:8000")
 
-# Initialize RAG engine
-rag_engine = RAGEngine(
-    max_depth=int(os.getenv("MAX_DEPTH", "2")),
-    max_pages=int(os.getenv("MAX_PAGES", "50")),
-    vector_persist_directory=os.getenv("VECTOR_DB_PATH", "./chroma_db"),
-    metadata_persist_directory=os.getenv("METADATA_DB_PATH", "./qdrant_db"),
-    gemini_api_key=os.getenv("GOOGLE_API_KEY"),
-    base_url=base_url
-)
+def create_rag_engine() -> RAGEngine:
+    """Create a RAG engine configured from the environment."""
+    return RAGEngine(
+        max_depth=int(os.getenv("MAX_DEPTH", "2")),
+        max_pages=int(os.getenv("MAX_PAGES", "50")),
+        vector_persist_directory=os.getenv("VECTOR_DB_PATH", "./chroma_db"),
+        metadata_persist_directory=os.getenv("METADATA_DB_PATH", "./qdrant_db"),
+        metadata_host=os.getenv("QDRANT_HOST") or None,
+        metadata_port=int(os.getenv("QDRANT_PORT", "6333")),
+        scrape_cache_path=os.getenv("SCRAPE_CACHE_PATH", "./scrape_cache.db") or None,
+        gemini_api_key=os.getenv("GOOGLE_API_KEY"),
+        base_url=base_url
+    )
+
+async def get_rag_engine(request: Request) -> RAGEngine:
+    """Return the RAG engine shared by this worker's requests."""
+    return request.app.state.rag_engine
+
+# Short-lived cache of per-collection existence checks
+COLLECTIONS_CACHE_TTL = 5.0
+COLLECTIONS_CACHE_MAX_SIZE = 1024
+_collection_exists_cache: Dict[str, tuple] = {}
+
+async def _collection_exists(engine: RAGEngine, collection_name: str) -> bool:
+    """Check whether a collection exists, reusing the answer for a few seconds."""
+    now = time.monotonic()
+    cached = _collection_exists_cache.get(collection_name)
+    if cached and now < cached[1]:
+        return cached[0]
+    
+    exists = await asyncio.to_thread(engine.collection_exists, collection_name)
+    if len(_collection_exists_cache) >= COLLECTIONS_CACHE_MAX_SIZE:
+        _collection_exists_cache.clear()
+    _collection_exists_cache[collection_name] = (exists, now + COLLECTIONS_CACHE_TTL)
+    return exists
+
+def _invalidate_collections_cache() -> None:
+    """Force the next existence checks to query the stores again."""
+    _collection_exists_cache.clear()
+
+# Answers to recent queries keyed by (collection, normalized query, top_k, prefilter).
+# Local to this worker process and only touched from its event loop, so no lock is needed
+QUERY_CACHE_TTL = 600.0
+QUERY_CACHE_MAX_SIZE = 2048
+_query_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+
+def _get_cached_response(key: tuple) -> Optional[str]:
+    """Return a cached answer that has not expired, or None."""
+    cached = _query_cache.get(key)
+    if cached is None:
+        return None
+    if time.monotonic() >= cached[1]:
+        del _query_cache[key]
+        return None
+    _query_cache.move_to_end(key)
+    return cached[0]
+
+def _cache_response(key: tuple, response: str) -> None:
+    """Remember an answer, skipping generation failures so they are retried."""
+    if response in (EMPTY_RESPONSE_MESSAGE, ERROR_RESPONSE_MESSAGE):
+        return
+    _query_cache[key] = (response, time.monotonic() + QUERY_CACHE_TTL)
+    _query_cache.move_to_end(key)
+    if len(_query_cache) > QUERY_CACHE_MAX_SIZE:
+        _query_cache.popitem(last=False)
+
+def _invalidate_query_cache(collection_name: str) -> None:
+    """Drop cached answers for a collection."""
+    for key in [key for key in _query_cache if key[0] == collection_name]:
+        del _query_cache[key]
+
+# On-disk content sizes per collection, refreshed at most every 30 seconds
+CONTENT_SIZE_CACHE_TTL = 30.0
+_content_size_cache: Dict[str, tuple] = {}
+
+def _content_size(vector_db_path: str, collection_name: str) -> int:
+    """Return the total size of files in a collection directory, cached briefly."""
+    now = time.monotonic()
+    cached = _content_size_cache.get(collection_name)
+    if cached and now < cached[1]:
+        return cached[0]
+    
+    size = 0
+    if os.path.isdir(vector_db_path):
+        with os.scandir(vector_db_path) as entries:
+            size = sum(entry.stat().st_size for entry in entries if entry.is_file())
+    
+    _content_size_cache[collection_name] = (size, now + CONTENT_SIZE_CACHE_TTL)
+    return size
 
 # Static files and templates
 app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -64,6 +202,7 @@ class QueryRequest(BaseModel):
     query: str
     collection_name: str
     top_k: Optional[int] = 5
+    prefilter: Optional[Literal["bm25"]] = None
 
 class IndexResponse(BaseModel):
     collection_name: str
@@ -89,10 +228,13 @@ class ImageInfo(BaseModel):
     alt: Optional[str] = None
     page_url: Optional[str] = None
     dimensions: Optional[str] = None
+    category: Optional[str] = None
+    file_size: Optional[int] = None
+    indexed_at: Optional[float] = None
 
 class ImagesResponse(BaseModel):
     collection_name: str
-    images: List[Dict[str, Any]]
+    images: List[ImageInfo]
     count: int
 
 # Routes
@@ -111,7 +253,7 @@ async def api_info():
     }
 
 @app.post("/index", response_model=IndexResponse)
-async def index_website(request: IndexRequest, background_tasks: BackgroundTasks):
+async def index_website(request: IndexRequest, background_tasks: BackgroundTasks, engine: RAGEngine = Depends(get_rag_engine)):
     """
     Index a website by URL.
     
@@ -119,296 +261,270 @@ async def index_website(request: IndexRequest, background_tasks: BackgroundTasks
     - **max_depth**: Maximum crawl depth (optional)
     - **max_pages**: Maximum number of pages to crawl (optional)
     """
-    # Update RAG engine configuration
-    rag_engine.scraper.max_depth = request.max_depth
-    rag_engine.scraper.max_pages = request.max_pages
+    # Crawl limits are passed per call, so concurrent requests don't share them
+    collection_name, document_count = await engine.index_website(
+        str(request.url),
+        max_depth=request.max_depth,
+        max_pages=request.max_pages
+    )
+    # The new collection must show up in existence checks right away
+    _invalidate_collections_cache()
     
-    try:
-        # Start indexing in background task
-        collection_name, document_count = await rag_engine.index_website(str(request.url))
-        
-        if not collection_name or document_count == 0:
-            raise HTTPException(status_code=400, detail="Failed to index website - no content found")
-        
-        return {
-            "collection_name": collection_name,
-            "document_count": document_count,
-            "message": f"Successfully indexed {document_count} pages from {request.url}",
-            "status": "success"
-        }
-    except Exception as e:
-        logger.error(f"Error indexing website: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error indexing website: {str(e)}")
+    if not collection_name or document_count == 0:
+        raise HTTPException(status_code=400, detail="Failed to index website - no content found")
+    
+    return {
+        "collection_name": collection_name,
+        "document_count": document_count,
+        "message": f"Successfully indexed {document_count} pages from {request.url}",
+        "status": "success"
+    }
 
 @app.post("/query", response_model=QueryResponse)
-async def query_collection(request: QueryRequest):
+async def query_collection(request: QueryRequest, engine: RAGEngine = Depends(get_rag_engine)):
     """
     Query indexed website content.
     
     - **query**: Question or query to answer
     - **collection_name**: Name of the indexed collection to query
     - **top_k**: Number of documents to retrieve (optional)
+    - **prefilter**: Set to "bm25" to narrow retrieval to keyword matches first (optional)
     
     Note: Including image-related terms like 'image', 'picture', 'photo', etc. 
     will trigger the image display functionality.
     """
-    try:
-        # Check if collection exists
-        collections = rag_engine.get_collections()
-        if request.collection_name not in collections:
-            raise HTTPException(status_code=404, detail=f"Collection '{request.collection_name}' not found")
-        
+    # Check if collection exists
+    if not await _collection_exists(engine, request.collection_name):
+        raise HTTPException(status_code=404, detail=f"Collection '{request.collection_name}' not found")
+    
+    # Serve repeated questions from the cache
+    cache_key = (request.collection_name, request.query.strip().lower(), request.top_k, request.prefilter)
+    response = _get_cached_response(cache_key)
+    
+    if response is None:
         # Generate response using the enhanced handle_query method
-        response = await rag_engine.handle_query(
+        response = await engine.handle_query(
             question=request.query,
             collection_name=request.collection_name,
-            top_k=request.top_k
+            top_k=request.top_k,
+            prefilter=request.prefilter
         )
-        
-        return {
-            "query": request.query,
-            "response": response,
-            "collection_name": request.collection_name
-        }
-    except Exception as e:
-        logger.error(f"Error querying collection: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error querying collection: {str(e)}")
+        _cache_response(cache_key, response)
+    
+    return {
+        "query": request.query,
+        "response": response,
+        "collection_name": request.collection_name
+    }
+
+@app.post("/query/stream")
+async def stream_query_collection(request: QueryRequest, engine: RAGEngine = Depends(get_rag_engine)):
+    """
+    Query indexed website content and stream the response as Server-Sent Events.
+    
+    Each event carries a JSON object with a `text` chunk; the final event is `{"done": true}`.
+    Accepts the same body as `/query`.
+    """
+    if not await _collection_exists(engine, request.collection_name):
+        raise HTTPException(status_code=404, detail=f"Collection '{request.collection_name}' not found")
+    
+    async def event_stream():
+        try:
+            async for chunk in engine.stream_query(
+                question=request.query,
+                collection_name=request.collection_name,
+                top_k=request.top_k,
+                prefilter=request.prefilter
+            ):
+                yield f"data: {json.dumps({'text': chunk})}\n\n"
+        except Exception as e:
+            logger.error(f"Error streaming query response: {str(e)}")
+            yield f"data: {json.dumps({'error': str(e)})}\n\n"
+        yield f"data: {json.dumps({'done': True})}\n\n"
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+async def _stream_json_array(items):
+    """Yield a JSON array one encoded element at a time, then the closing bracket."""
+    yield "["
+    first = True
+    async for item in items:
+        yield ("" if first else ",") + json.dumps(item, separators=(",", ":"))
+        first = False
+    yield "]"
 
 @app.get("/collections", response_model=List[str])
-async def list_collections():
+async def list_collections(engine: RAGEngine = Depends(get_rag_engine)):
     """List all indexed collections."""
-    try:
-        collections = rag_engine.get_collections()
-        return collections
-    except Exception as e:
-        logger.error(f"Error listing collections: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error listing collections: {str(e)}")
+    return StreamingResponse(_stream_json_array(engine.iter_collections()), media_type="application/json")
 
 @app.get("/collections/{collection_name}", response_model=CollectionInfo)
 @app.get("/collection/{collection_name}", response_model=CollectionInfo)
-async def get_collection_info(collection_name: str):
+async def get_collection_info(collection_name: str, engine: RAGEngine = Depends(get_rag_engine)):
     """Get information about a specific collection."""
-    try:
-        # Check if collection exists
-        collections = rag_engine.get_collections()
-        if collection_name not in collections:
-            raise HTTPException(status_code=404, detail=f"Collection '{collection_name}' not found")
-        
-        # Get collection info
-        indexed_websites = rag_engine.get_indexed_websites()
-        if collection_name not in indexed_websites:
-            # Try to create a minimal info object if collection exists but metadata is missing
-            return {
-                "name": collection_name,
-                "url": "",
-                "document_count": rag_engine.get_collection_size(collection_name),
-                "indexed_at": 0,
-                "domain": collection_name.split('_')[0] if '_' in collection_name else collection_name,
-                "image_count": 0
-            }
-        
-        collection_info = indexed_websites[collection_name]
+    # Check if collection exists
+    if not await _collection_exists(engine, collection_name):
+        raise HTTPException(status_code=404, detail=f"Collection '{collection_name}' not found")
+    
+    # Get collection info
+    collection_info = engine.get_indexed_website(collection_name)
+    if collection_info is None:
+        # Try to create a minimal info object if collection exists but metadata is missing
         return {
             "name": collection_name,
-            **collection_info
+            "url": "",
+            "document_count": await asyncio.to_thread(engine.get_collection_size, collection_name),
+            "indexed_at": 0,
+            "domain": collection_name.split('_')[0] if '_' in collection_name else collection_name,
+            "image_count": 0
         }
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error getting collection info: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error getting collection info: {str(e)}")
+    
+    return {
+        "name": collection_name,
+        **collection_info
+    }
 
 @app.delete("/collections/{collection_name}")
 @app.delete("/collection/{collection_name}")
-async def delete_collection(collection_name: str):
+async def delete_collection(collection_name: str, engine: RAGEngine = Depends(get_rag_engine)):
     """Delete a collection and all its data."""
-    try:
-        # Check if collection exists
-        collections = rag_engine.get_collections()
-        if collection_name not in collections:
-            raise HTTPException(status_code=404, detail=f"Collection '{collection_name}' not found")
-        
-        # Delete collection
-        success = rag_engine.delete_collection(collection_name)
-        if not success:
-            raise HTTPException(status_code=500, detail=f"Failed to delete collection '{collection_name}'")
-        
-        return {"message": f"Collection '{collection_name}' deleted successfully"}
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error deleting collection: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error deleting collection: {str(e)}")
+    # Check if collection exists
+    if not await _collection_exists(engine, collection_name):
+        raise HTTPException(status_code=404, detail=f"Collection '{collection_name}' not found")
+    
+    # Delete collection
+    success = await engine.delete_collection(collection_name)
+    _invalidate_collections_cache()
+    _content_size_cache.pop(collection_name, None)
+    _invalidate_query_cache(collection_name)
+    if not success:
+        raise HTTPException(status_code=500, detail=f"Failed to delete collection '{collection_name}'")
+    
+    return {"message": f"Collection '{collection_name}' deleted successfully"}
 
 
 @app.get("/images/{collection_name}")
-async def view_collection_images(collection_name: str, limit: int = Query(20, ge=1, le=100)):
+async def view_collection_images(
+    collection_name: str, 
+    limit: int = Query(20, ge=1, le=100),
+    engine: RAGEngine = Depends(get_rag_engine)
+):
     """Return images from a specific collection as JSON."""
-    try:
-        # Check if collection exists
-        collections = rag_engine.get_collections()
-        if collection_name not in collections:
-            raise HTTPException(status_code=404, detail=f"Collection '{collection_name}' not found")
-        
-        # Get images
-        images = rag_engine.get_images(collection_name, limit)
-        
-        # Return JSON
-        return {
-            "collection_name": collection_name,
-            "images": images,
-            "count": len(images)
-        }
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error getting collection images: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error getting collection images: {str(e)}")
+    # Check if collection exists
+    if not await _collection_exists(engine, collection_name):
+        raise HTTPException(status_code=404, detail=f"Collection '{collection_name}' not found")
+    
+    # Get images
+    images = await asyncio.to_thread(engine.get_images, collection_name, limit)
+    
+    # Return JSON
+    return {
+        "collection_name": collection_name,
+        "images": images,
+        "count": len(images)
+    }
 
 
-@app.get("/api/images/{collection_name}", response_model=ImagesResponse)
+@app.get("/api/images/{collection_name}", response_model=ImagesResponse, response_model_exclude_unset=True)
 async def get_collection_images(
     collection_name: str, 
     limit: int = Query(20, ge=1, le=100),
     page: int = Query(1, ge=1),
     search: Optional[str] = None,
     category: Optional[str] = None,
-    sort: Optional[str] = "newest"
+    sort: Optional[str] = "newest",
+    engine: RAGEngine = Depends(get_rag_engine)
 ):
     """Get images from a specific collection as JSON data."""
-    try:
-        # Check if collection exists
-        collections = rag_engine.get_collections()
-        if collection_name not in collections:
-            raise HTTPException(status_code=404, detail=f"Collection '{collection_name}' not found")
-        
-        # Get images with pagination, filtering and sorting
-        start_idx = (page - 1) * limit
-        end_idx = start_idx + limit
-        
-        # Get images from RAG engine
-        all_images = rag_engine.get_images(collection_name, None)  # Get all images
-        filtered_images = []
-        
-        # Apply search filter if provided
-        if search and search.strip():
-            search_term = search.lower()
-            all_images = [img for img in all_images if 
-                         (img.get('alt') and search_term in img.get('alt', '').lower())]
-        
-        # Apply category filter if provided
-        if category and category != 'all':
-            all_images = [img for img in all_images if img.get('category') == category]
-        
-        # Apply sorting
-        if sort == "newest":
-            all_images.sort(key=lambda x: x.get('indexed_at', 0), reverse=True)
-        elif sort == "oldest":
-            all_images.sort(key=lambda x: x.get('indexed_at', 0))
-        elif sort == "size_desc":
-            all_images.sort(key=lambda x: x.get('file_size', 0), reverse=True)
-        elif sort == "size_asc":
-            all_images.sort(key=lambda x: x.get('file_size', 0))
-        elif sort == "alpha":
-            all_images.sort(key=lambda x: x.get('alt', '').lower())
-        
-        # Apply pagination
-        paginated_images = all_images[start_idx:end_idx]
-        
-        return {"collection_name": collection_name, "images": paginated_images, "count": len(all_images)}
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error getting collection images: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error getting collection images: {str(e)}")
+    # Check if collection exists
+    if not await _collection_exists(engine, collection_name):
+        raise HTTPException(status_code=404, detail=f"Collection '{collection_name}' not found")
+    
+    # Get a filtered, sorted page of images from the RAG engine
+    start_idx = (page - 1) * limit
+    paginated_images, total = await asyncio.to_thread(
+        engine.query_images,
+        collection_name,
+        search=search,
+        category=category,
+        sort=sort,
+        offset=start_idx,
+        limit=limit
+    )
+    
+    return {"collection_name": collection_name, "images": paginated_images, "count": total}
 
 @app.get("/image-categories/{collection_name}")
-async def get_image_categories(collection_name: str):
+async def get_image_categories(collection_name: str, engine: RAGEngine = Depends(get_rag_engine)):
     """Get all image categories from a collection."""
-    try:
-        # Check if collection exists
-        collections = rag_engine.get_collections()
-        if collection_name not in collections:
-            raise HTTPException(status_code=404, detail=f"Collection '{collection_name}' not found")
-        
-        # Get all images
-        images = rag_engine.get_images(collection_name, None)
-        
-        # Extract unique categories
-        categories = set()
-        for image in images:
-            if image.get('category'):
-                categories.add(image.get('category'))
-        
-        return list(categories)
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error getting image categories: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error getting image categories: {str(e)}")
+    # Check if collection exists
+    if not await _collection_exists(engine, collection_name):
+        raise HTTPException(status_code=404, detail=f"Collection '{collection_name}' not found")
+    
+    # Get all images
+    images = await asyncio.to_thread(engine.get_images, collection_name, None)
+    
+    # Extract unique categories
+    categories = set()
+    for image in images:
+        if image.get('category'):
+            categories.add(image.get('category'))
+    
+    return list(categories)
 
 @app.get("/collection-stats/{collection_name}")
-async def get_collection_stats(collection_name: str):
+async def get_collection_stats(collection_name: str, engine: RAGEngine = Depends(get_rag_engine)):
     """Get statistics for a specific collection with better error handling."""
+    # Initialize default stats
+    stats = {
+        "pages_count": 0,
+        "images_count": 0,
+        "content_size": 0
+    }
+    
+    # Check if collection exists
     try:
-        # Check if collection exists
-        collections = rag_engine.get_collections()
-        if collection_name not in collections:
-            logger.warning(f"Collection '{collection_name}' not found in available collections")
-            raise HTTPException(status_code=404, detail=f"Collection '{collection_name}' not found")
-        
-        # Initialize default stats
-        stats = {
-            "pages_count": 0,
-            "images_count": 0,
-            "content_size": 0
-        }
-        
-        # Try to get info from indexed_websites first
-        try:
-            indexed_websites = rag_engine.get_indexed_websites()
-            if collection_name in indexed_websites:
-                collection_info = indexed_websites[collection_name]
-                stats["pages_count"] = collection_info.get("document_count", 0)
-                stats["images_count"] = collection_info.get("image_count", 0)
-            else:
-                logger.warning(f"Collection '{collection_name}' exists but not found in indexed_websites")
-        except Exception as e:
-            logger.error(f"Error getting indexed website info: {str(e)}")
-            # Continue with default stats
-        
-        # If we couldn't get pages_count from indexed_websites, try another approach
-        if stats["pages_count"] == 0:
-            try:
-                # Try to use the fixed get_collection_size method
-                collection_size = rag_engine.get_collection_size(collection_name)
-                if collection_size is not None and collection_size > 0:
-                    stats["pages_count"] = collection_size
-            except Exception as e:
-                logger.error(f"Error getting collection size: {str(e)}")
-        
-        # Calculate content size if possible
-        try:
-            if hasattr(rag_engine, 'vector_store') and hasattr(rag_engine.vector_store, 'persist_directory'):
-                vector_db_path = os.path.join(rag_engine.vector_store.persist_directory, collection_name)
-                if os.path.exists(vector_db_path):
-                    stats["content_size"] = sum(os.path.getsize(os.path.join(vector_db_path, f)) 
-                                               for f in os.listdir(vector_db_path) 
-                                               if os.path.isfile(os.path.join(vector_db_path, f)))
-        except Exception as e:
-            logger.error(f"Error calculating content size: {str(e)}")
-        
-        return stats
-    except HTTPException:
-        raise
+        exists = await _collection_exists(engine, collection_name)
     except Exception as e:
         logger.error(f"Error getting collection stats: {str(e)}")
         # Return basic stats even in case of errors
-        return {
-            "pages_count": 0,
-            "images_count": 0,
-            "content_size": 0
-        }
+        return stats
+    
+    if not exists:
+        logger.warning(f"Collection '{collection_name}' not found in available collections")
+        raise HTTPException(status_code=404, detail=f"Collection '{collection_name}' not found")
+    
+    # Try to get info from indexed_websites first
+    try:
+        collection_info = engine.get_indexed_website(collection_name)
+        if collection_info is not None:
+            stats["pages_count"] = collection_info.get("document_count", 0)
+            stats["images_count"] = collection_info.get("image_count", 0)
+        else:
+            logger.warning(f"Collection '{collection_name}' exists but not found in indexed_websites")
+    except Exception as e:
+        logger.error(f"Error getting indexed website info: {str(e)}")
+        # Continue with default stats
+    
+    # If we couldn't get pages_count from indexed_websites, try another approach
+    if stats["pages_count"] == 0:
+        try:
+            # Try to use the fixed get_collection_size method
+            collection_size = await asyncio.to_thread(engine.get_collection_size, collection_name)
+            if collection_size is not None and collection_size > 0:
+                stats["pages_count"] = collection_size
+        except Exception as e:
+            logger.error(f"Error getting collection size: {str(e)}")
+    
+    # Calculate content size if possible
+    try:
+        if hasattr(engine, 'vector_store') and hasattr(engine.vector_store, 'persist_directory'):
+            vector_db_path = os.path.join(engine.vector_store.persist_directory, collection_name)
+            stats["content_size"] = await asyncio.to_thread(_content_size, vector_db_path, collection_name)
+    except Exception as e:
+        logger.error(f"Error calculating content size: {str(e)}")
+    
+    return stats
 
 # Health check endpoint
 @app.get("/health")
@@ -418,20 +534,24 @@ async def health_check():
 
 # Metrics endpoint
 @app.get("/metrics")
-async def metrics():
+async def metrics(engine: RAGEngine = Depends(get_rag_engine)):
     """Basic metrics about the service."""
-    try:
-        collections = rag_engine.get_collections()
-        websites = rag_engine.get_indexed_websites()
+    async def stream_metrics():
+        # Count while streaming so the collection list is never held in full
+        total = 0
         
-        return {
-            "total_collections": len(collections),
-            "indexed_websites": len(websites),
-            "collections": collections
-        }
-    except Exception as e:
-        logger.error(f"Error getting metrics: {str(e)}")
-        return {"status": "error", "message": str(e)}
+        async def counted_collections():
+            nonlocal total
+            async for name in engine.iter_collections():
+                total += 1
+                yield name
+        
+        yield '{"collections":'
+        async for part in _stream_json_array(counted_collections()):
+            yield part
+        yield f',"total_collections":{total},"indexed_websites":{len(engine.get_indexed_websites())}}}'
+    
+    return StreamingResponse(stream_metrics(), media_type="application/json")
 
 if __name__ == "__main__":
     import uvicorn
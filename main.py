@@ -28,15 +28,29 @@ def main():
     # Get configuration from environment
     host = os.getenv("HOST", "0.0.0.0")
     port = int(os.getenv("PORT", "8000"))
+    env = os.getenv("ENV", "prod")
     
-    logger.info(f"Starting RAG-powered website chatbot on {host}:{port}")
+    # Auto-reload only in development. The app runs a single worker: every worker would open
+    # the same local Chroma directory (VECTOR_DB_PATH), which isn't safe across processes, and
+    # keep its own indexed-site list, caches and keyword index
+    reload = env == "dev"
+    workers = 1 if reload else int(os.getenv("WORKERS", "1"))
+    if workers > 1:
+        logger.error("WORKERS > 1 is not supported: the local Chroma store (VECTOR_DB_PATH) can only "
+                     "be used safely by one process; scale by running separate instances instead")
+        raise SystemExit(1)
+    
+    logger.info(f"Starting RAG-powered website chatbot on {host}:{port} ({env}, {workers} worker(s))")
     
     # Run the FastAPI application
     uvicorn.run(
         "app:app",
         host=host,
         port=port,
-        reload=True,
+        reload=reload,
+        workers=workers,
+        loop=os.getenv("UVICORN_LOOP", "uvloop"),
+        http=os.getenv("UVICORN_HTTP", "httptools"),
         log_level="info"
     )
 
@@ -1,11 +1,25 @@
 """
 RAG-powered website chatbot package.
+
+Classes are imported on first access, so importing a light submodule (as the
+scraper's parse workers do) doesn't pull in the vector stores and Gemini SDK.
 """
 
-from .scraper import WebScraper
-from .vectorstore import VectorStore
-from .gemini_client import GeminiClient
-from .qdrant_store import QdrantStore
-from .rag_engine import RAGEngine
+import importlib
+
+# Public class name -> submodule defining it
+_EXPORTS = {
+    'WebScraper': '.scraper',
+    'VectorStore': '.vectorstore',
+    'GeminiClient': '.gemini_client',
+    'QdrantStore': '.qdrant_store',
+    'RAGEngine': '.rag_engine',
+}
+
+__all__ = ['WebScraper', 'VectorStore', 'GeminiClient', 'RAGEngine', 'QdrantStore']
 
-__all__ = ['WebScraper', 'VectorStore', 'GeminiClient', 'RAGEngine', 'QdrantStore']
\ No newline at end of file
+def __getattr__(name):
+    """Import the submodule that defines a public class when it is first requested."""
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,49 @@
+"""
+Embedding function module backed by fastembed.
+Runs the default MiniLM model through fastembed's ONNX Runtime pipeline instead of Chroma's.
+"""
+
+from typing import Any, Optional
+
+from chromadb.api.types import Documents, Embeddings
+from chromadb.utils.embedding_functions import DefaultEmbeddingFunction
+
+# Model served by fastembed; the same model as Chroma's default embedding function
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+class FastEmbedFunction(DefaultEmbeddingFunction):
+    """
+    Chroma embedding function that embeds documents with fastembed.
+    
+    It reports itself as Chroma's "default" function: both produce the same
+    all-MiniLM-L6-v2 vectors, so collections created with either stay
+    interchangeable.
+    """
+    
+    def __init__(self, model_name: str = EMBEDDING_MODEL_NAME, **kwargs: Any):
+        """
+        Load the fastembed model.
+        
+        Args:
+            model_name: fastembed model identifier (default: EMBEDDING_MODEL_NAME)
+            **kwargs: Extra arguments passed to fastembed.TextEmbedding
+        
+        Raises:
+            ImportError: If fastembed is not installed
+        """
+        from fastembed import TextEmbedding
+        self._model = TextEmbedding(model_name, providers=["CPUExecutionProvider"], **kwargs)
+    
+    def __call__(self, input: Documents) -> Embeddings:
+        """Embed a batch of documents in a single forward pass."""
+        return list(self._model.embed(input, batch_size=max(len(input), 1)))
+    
+    def tokenizer_json(self) -> Optional[str]:
+        """
+        Return the tokenizer fastembed loaded from its local model cache.
+        
+        Returns:
+            The tokenizer serialized as JSON, or None if fastembed doesn't expose it
+        """
+        tokenizer = getattr(getattr(self._model, "model", None), "tokenizer", None)
+        return tokenizer.to_str() if tokenizer is not None else None
@@ -4,8 +4,10 @@ Handles API authentication and prompt formatting.
 """
 
 import os
+import asyncio
 import logging
-from typing import List, Dict, Optional, Any
+import textwrap
+from typing import List, Dict, Optional, Any, Set, AsyncIterator
 
 import google.generativeai as genai
 from dotenv import load_dotenv
@@ -17,6 +19,29 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Instructions prepended to every generation prompt
+SYSTEM_PROMPT = textwrap.dedent("""\
+    You are an AI assistant powered by Google Gemini, serving as a helpful and informative chatbot for a website.
+    Your task is to answer questions based ONLY on the context provided below.
+    If the answer cannot be found in the context, politely state that you don't have enough information rather than making up an answer.
+    Always provide accurate, factual responses based solely on the context.
+    Format your response in a clear, concise manner. If appropriate, use markdown formatting for readability.
+
+    Remember:
+    1. Only use information found in the context below
+    2. If information is missing, acknowledge the limitations
+    3. Do not reference that you're using "context" or "documents" in your answer
+    4. Do not mention that you're an AI unless directly asked about your nature
+    5. Make your response conversational and helpful
+    """)
+
+# Replies used when generation fails or returns nothing
+EMPTY_RESPONSE_MESSAGE = "I apologize, but I couldn't generate a proper response. Please try rephrasing your question."
+ERROR_RESPONSE_MESSAGE = "I encountered an error while generating your response. Please try again later."
+
+# Most queued prompts dispatched together by the request queue
+BATCH_MAX_SIZE = 8
+
 class GeminiClient:
     """Client for interacting with Google's Gemini API."""
     
@@ -36,10 +61,19 @@ class GeminiClient:
         # Configure Gemini
         genai.configure(api_key=self.api_key)
         
+        # Instructions shared by every prompt
+        self.system_prompt = SYSTEM_PROMPT
+        
         # Set default model
         self.model_name = "gemini-1.5-pro"
         self.model = genai.GenerativeModel(self.model_name)
         
+        # Request queue state, created lazily on the running event loop
+        self._batch_queue: Optional[asyncio.Queue] = None
+        self._batch_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._batch_task: Optional[asyncio.Task] = None
+        self._dispatch_tasks: Set[asyncio.Task] = set()
+        
         logger.info(f"Initialized Gemini client with model: {self.model_name}")
     
     def create_context_prompt(self, retrieved_docs: List[Dict]) -> str:
@@ -68,6 +102,55 @@ class GeminiClient:
         
         return "\n---\n".join(context_parts)
     
+    def _build_prompt(self, query: str, context: str) -> str:
+        """Build the complete prompt from the system instructions, context and question."""
+        return f"{self.system_prompt}\nCONTEXT:\n{context}\n\nUSER QUESTION:\n{query}\n\nYOUR RESPONSE:\n"
+    
+    def _get_batch_queue(self) -> asyncio.Queue:
+        """Return the request queue, starting the batch consumer on the current loop if needed."""
+        loop = asyncio.get_running_loop()
+        if self._batch_queue is None or self._batch_loop is not loop or self._batch_task.done():
+            self._batch_queue = asyncio.Queue()
+            self._batch_loop = loop
+            self._batch_task = loop.create_task(self._consume_batches(self._batch_queue))
+        return self._batch_queue
+    
+    async def _consume_batches(self, queue: asyncio.Queue) -> None:
+        """
+        Take queued prompts in groups of up to BATCH_MAX_SIZE and dispatch them.
+        
+        A prompt is dispatched as soon as it is dequeued, together with whatever
+        else is already waiting; nothing waits for more prompts to arrive. The
+        Gemini API has no batch endpoint, so each prompt is still its own
+        generate_content call: this only funnels requests through one consumer
+        and saves no RPCs.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < BATCH_MAX_SIZE and not queue.empty():
+                batch.append(queue.get_nowait())
+            
+            # Dispatch without waiting so the next batch can start filling
+            task = loop.create_task(self._dispatch_batch(batch))
+            self._dispatch_tasks.add(task)
+            task.add_done_callback(self._dispatch_tasks.discard)
+    
+    async def _dispatch_batch(self, batch: List[tuple]) -> None:
+        """Issue the generation calls for a batch concurrently and resolve their futures."""
+        results = await asyncio.gather(
+            *(self.model.generate_content_async(prompt) for prompt, _ in batch),
+            return_exceptions=True
+        )
+        
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+    
     async def generate_response(self, query: str, context: str) -> str:
         """
         Generate a response using Gemini API.
@@ -80,46 +163,47 @@ class GeminiClient:
             Generated response
         """
         try:
-            # Build the system prompt with instructions
-            system_prompt = """
-            You are an AI assistant powered by Google Gemini, serving as a helpful and informative chatbot for a website.
-            Your task is to answer questions based ONLY on the context provided below.
-            If the answer cannot be found in the context, politely state that you don't have enough information rather than making up an answer.
-            Always provide accurate, factual responses based solely on the context.
-            Format your response in a clear, concise manner. If appropriate, use markdown formatting for readability.
-            
-            Remember:
-            1. Only use information found in the context below
-            2. If information is missing, acknowledge the limitations
-            3. Do not reference that you're using "context" or "documents" in your answer
-            4. Do not mention that you're an AI unless directly asked about your nature
-            5. Make your response conversational and helpful
-            """
-            
-            # Build the complete prompt
-            prompt = f"""
-            {system_prompt}
-            
-            CONTEXT:
-            {context}
-            
-            USER QUESTION:
-            {query}
-            
-            YOUR RESPONSE:
-            """
-            
-            # Generate content
-            response = await self.model.generate_content_async(prompt)
+            # Generate content through the request queue
+            future = asyncio.get_running_loop().create_future()
+            await self._get_batch_queue().put((self._build_prompt(query, context), future))
+            response = await future
             
             if not response.text:
-                return "I apologize, but I couldn't generate a proper response. Please try rephrasing your question."
+                return EMPTY_RESPONSE_MESSAGE
             
             return response.text
             
         except Exception as e:
             logger.error(f"Error generating response: {str(e)}")
-            return f"I encountered an error while generating your response. Please try again later."
+            return ERROR_RESPONSE_MESSAGE
+
+    async def stream_response(self, query: str, context: str) -> AsyncIterator[str]:
+        """
+        Generate a response using Gemini API, yielding text as it arrives.
+        
+        Args:
+            query: User question
+            context: Context information from retrieved documents
+            
+        Yields:
+            Chunks of the generated response
+        """
+        try:
+            response = await self.model.generate_content_async(self._build_prompt(query, context), stream=True)
+            async for chunk in response:
+                if chunk.text:
+                    yield chunk.text
+                    
+        except Exception as e:
+            logger.error(f"Error streaming response: {str(e)}")
+            yield ERROR_RESPONSE_MESSAGE
+
+    async def close(self) -> None:
+        """Stop the batch consumer; the SDK's own channel is released at process exit."""
+        if self._batch_task is not None:
+            self._batch_task.cancel()
+            self._batch_task = None
+            self._batch_queue = None
 
     def set_model(self, model_name: str) -> bool:
         """
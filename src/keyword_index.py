@@ -0,0 +1,88 @@
+"""
+Keyword index module for lexical prefiltering of document chunks.
+Scores chunks with BM25 so dense vector search can be limited to likely candidates.
+"""
+
+import re
+import threading
+from collections import Counter
+from typing import List, Dict, Set
+
+import numpy as np
+
+# Tokens are runs of word characters in lowercased text
+TOKEN_PATTERN = re.compile(r"\w+")
+
+class KeywordIndex:
+    """In-memory BM25 inverted index over the chunks of one collection."""
+    
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        """
+        Initialize an empty keyword index.
+        
+        Args:
+            k1: BM25 term frequency saturation (default: 1.5)
+            b: BM25 document length normalization (default: 0.75)
+        """
+        self.k1 = k1
+        self.b = b
+        self.ids: List[str] = []
+        self.id_set: Set[str] = set()
+        self.lengths: List[int] = []
+        # token -> {chunk position: term frequency}
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self._lock = threading.Lock()
+    
+    def add(self, chunk_id: str, text: str) -> None:
+        """Add a chunk's text to the index; chunks already indexed are ignored."""
+        tokens = TOKEN_PATTERN.findall(text.lower())
+        
+        with self._lock:
+            if chunk_id in self.id_set:
+                return
+            position = len(self.ids)
+            self.ids.append(chunk_id)
+            self.id_set.add(chunk_id)
+            self.lengths.append(len(tokens))
+            for token, frequency in Counter(tokens).items():
+                self.postings.setdefault(token, {})[position] = frequency
+    
+    def top_k(self, query: str, k: int) -> List[str]:
+        """
+        Return the ids of the k chunks that score highest for the query.
+        
+        Args:
+            query: Query text
+            k: Maximum number of chunk ids to return
+        
+        Returns:
+            Chunk ids ordered by descending BM25 score; chunks sharing no
+            term with the query are never returned
+        """
+        query_tokens = set(TOKEN_PATTERN.findall(query.lower()))
+        
+        with self._lock:
+            count = len(self.ids)
+            if not count or not query_tokens:
+                return []
+            
+            lengths = np.asarray(self.lengths, dtype=np.float64)
+            length_norm = self.k1 * (1 - self.b + self.b * lengths / (lengths.mean() or 1.0))
+            scores = np.zeros(count, dtype=np.float64)
+            
+            for token in query_tokens:
+                postings = self.postings.get(token)
+                if not postings:
+                    continue
+                positions = np.fromiter(postings.keys(), dtype=np.int64, count=len(postings))
+                frequencies = np.fromiter(postings.values(), dtype=np.float64, count=len(postings))
+                idf = np.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                scores[positions] += idf * frequencies * (self.k1 + 1) / (frequencies + length_norm[positions])
+            
+            matched = np.flatnonzero(scores > 0)
+            # Select the top k without sorting every match, then order just those
+            if matched.size > k:
+                matched = matched[np.argpartition(scores[matched], -k)[-k:]]
+            matched = matched[np.argsort(-scores[matched], kind="stable")]
+            
+            return [self.ids[i] for i in matched]
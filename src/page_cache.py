@@ -0,0 +1,80 @@
+"""
+Page cache module for conditional re-fetching of scraped pages.
+Keeps page bodies on disk with their validators so unchanged pages come back as 304,
+along with the parsed content so those pages need not be parsed again.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional, Tuple
+
+class PageCache:
+    """On-disk cache of fetched pages keyed by normalized URL, backed by SQLite."""
+    
+    def __init__(self, path: str = "./scrape_cache.db"):
+        """
+        Open (or create) the page cache.
+        
+        Args:
+            path: Path of the SQLite database file (default: "./scrape_cache.db")
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        # One connection shared by the scraper's worker threads
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                "url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, "
+                "charset TEXT, body BLOB, fetched_at REAL, parsed TEXT)"
+            )
+            # Caches created before parsed content was stored lack the column
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(pages)")}
+            if "parsed" not in columns:
+                self._conn.execute("ALTER TABLE pages ADD COLUMN parsed TEXT")
+            self._conn.commit()
+    
+    def get(self, url: str) -> Optional[Tuple[Optional[str], Optional[str], Optional[str], bytes, Optional[str]]]:
+        """
+        Look up a cached page.
+        
+        Args:
+            url: Normalized page URL
+        
+        Returns:
+            Tuple of (etag, last_modified, charset, body, parsed), or None if not cached;
+            parsed is the JSON stored with put_parsed, or None if the page wasn't parsed yet
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, charset, body, parsed FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+        return row
+    
+    def put(self, url: str, etag: Optional[str], last_modified: Optional[str],
+            charset: Optional[str], body: bytes) -> None:
+        """Store a fetched page with the validators needed to revalidate it, dropping any old parse."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (url, etag, last_modified, charset, body, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, charset, body, time.time())
+            )
+            self._conn.commit()
+    
+    def put_parsed(self, url: str, parsed: str) -> None:
+        """Attach parsed content (JSON) to a cached page; pages not in the cache are ignored."""
+        with self._lock:
+            self._conn.execute("UPDATE pages SET parsed = ? WHERE url = ?", (parsed, url))
+            self._conn.commit()
+    
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,136 @@
+"""
+Page parsing module for extracting content and links from fetched HTML.
+Kept free of heavy imports because the scraper's spawned parse workers import it.
+"""
+
+from functools import lru_cache
+from urllib.parse import urljoin, urlparse
+from typing import List, Dict, Optional, Tuple
+
+from bs4 import BeautifulSoup
+
+@lru_cache(maxsize=10000)
+def cached_urlparse(url: str):
+    """Parse a URL, reusing the result for URLs seen before (links repeat across pages)."""
+    return urlparse(url)
+
+@lru_cache(maxsize=10000)
+def normalize_url(url: str) -> str:
+    """Normalize URL by removing fragments and trailing slashes."""
+    parsed = cached_urlparse(url)
+    # Remove fragments and any trailing slashes
+    return f"{parsed.scheme}://{parsed.netloc}{parsed.path.rstrip('/')}"
+
+# Elements dropped before extracting text; anything inside them is ignored
+REMOVED_TAGS = ("script", "style", "header", "footer", "nav")
+
+def is_http_url(parsed) -> bool:
+    """Cheap validity check for an already parsed URL: http(s) with a host."""
+    return parsed.scheme in ('http', 'https') and bool(parsed.netloc)
+
+def extract_all(soup: BeautifulSoup, base_url: str, with_links: bool = True) -> Tuple[str, Dict, List[Dict], List[str]]:
+    """
+    Extract text, structured data, images and links from a page in one pass over the tree.
+    
+    Args:
+        soup: Parsed page
+        base_url: URL of the page, for resolving relative links and images
+        with_links: Whether to collect links to crawl (default: True)
+    
+    Returns:
+        Tuple of (text content, structured data, images, links)
+    """
+    names = ['title', 'meta', 'img', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', *REMOVED_TAGS]
+    if with_links:
+        names.append('a')
+    tags = soup.find_all(names)
+    
+    # Remove script and style elements (and page chrome) first; their
+    # descendants are marked decomposed and skipped below
+    for tag in tags:
+        if tag.name in REMOVED_TAGS and not tag.decomposed:
+            tag.decompose()
+    
+    structured_data = {}
+    headings: Dict[str, List[str]] = {}
+    images = []
+    links = []
+    # Parse the page URL once rather than for every link
+    base_netloc = cached_urlparse(base_url).netloc
+    
+    for tag in tags:
+        if tag.decomposed:
+            continue
+        name = tag.name
+    
+        if name == 'a':
+            if tag.get('href') is None:
+                continue
+            # Create absolute URL and keep http(s) URLs on the same domain;
+            # malformed hrefs (e.g. a broken IPv6 host) are skipped
+            try:
+                abs_url = urljoin(base_url, tag['href'])
+                parsed = cached_urlparse(abs_url)
+            except ValueError:
+                continue
+            if parsed.netloc == base_netloc and is_http_url(parsed):
+                links.append(normalize_url(abs_url))
+    
+        elif name == 'img':
+            image_info = extract_image(tag, base_url)
+            if image_info:
+                images.append(image_info)
+    
+        elif name == 'title':
+            # Extract title
+            structured_data.setdefault('title', tag.text.strip())
+    
+        elif name == 'meta':
+            # Extract meta description
+            if 'description' not in structured_data and tag.get('name') == 'description' and tag.get('content'):
+                structured_data['description'] = tag['content'].strip()
+    
+        else:
+            headings.setdefault(name, []).append(tag.text.strip())
+    
+    # Convert heading lists to comma-separated strings instead of nested dictionaries
+    for i in range(1, 7):
+        if f'h{i}' in headings:
+            structured_data[f'h{i}_headings'] = ", ".join(headings[f'h{i}'])
+    
+    # Get text and collapse runs of whitespace (str.split/join is much faster than a regex here)
+    text = ' '.join(soup.get_text(separator=' ').split())
+    
+    return text, structured_data, images, links
+
+def extract_image(img_tag, base_url: str) -> Optional[Dict]:
+    """Extract an image's attributes, or None if it has no usable source."""
+    # Skip if no src attribute
+    if not img_tag.get('src'):
+        return None
+    
+    # Create absolute URL for image source, skipping malformed ones
+    try:
+        abs_src = urljoin(base_url, img_tag['src'])
+        parsed = cached_urlparse(abs_src)
+    except ValueError:
+        return None
+    
+    # Skip data URIs and anything that isn't an http(s) URL
+    if abs_src.startswith('data:') or not is_http_url(parsed):
+        return None
+    
+    # Extract image attributes
+    return {
+        'src': abs_src,
+        'alt': img_tag.get('alt', ''),
+        'width': img_tag.get('width', ''),
+        'height': img_tag.get('height', ''),
+        'title': img_tag.get('title', '')
+    }
+
+def parse_and_extract(html: bytes, encoding: Optional[str], url: str, parser: str,
+                       with_links: bool) -> Tuple[str, Dict, List[Dict], List[str]]:
+    """Parse a page and extract its content; module level so worker processes can run it."""
+    soup = BeautifulSoup(html, parser, from_encoding=encoding)
+    return extract_all(soup, url, with_links)
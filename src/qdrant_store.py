@@ -5,18 +5,27 @@ Complements the vector store by handling structured metadata like images.
 
 import os
 import logging
-from typing import List, Dict, Optional, Any, Union
+from typing import List, Dict, Optional, Any, Union, Tuple
 import time
 import uuid
 
+import numpy as np
 from qdrant_client import QdrantClient
 from qdrant_client.http import models
-from qdrant_client.http.models import PointStruct, VectorParams, Distance, Filter, FieldCondition, MatchValue
+from qdrant_client.http.models import Filter, FieldCondition, MatchValue
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Points per upload request and number of concurrent upload workers; the worker
+# pool is only started for uploads spanning at least one batch per worker
+UPLOAD_BATCH_SIZE = 512
+UPLOAD_PARALLEL = 4
+
+# Points fetched per scroll request when paging through a collection
+SCROLL_PAGE_SIZE = 256
+
 class QdrantStore:
     """Manages structured metadata including image information using Qdrant."""
     
@@ -24,7 +33,9 @@ class QdrantStore:
                  host: Optional[str] = None, 
                  port: Optional[int] = None,
                  path: Optional[str] = "./qdrant_db",
-                 in_memory: bool = False):
+                 in_memory: bool = False,
+                 grpc_port: int = 6334,
+                 pool_size: int = 64):
         """
         Initialize the Qdrant metadata store.
         
@@ -33,14 +44,25 @@ class QdrantStore:
             port: Qdrant server port (if using remote)
             path: Path for local persistence (if not using remote)
             in_memory: Whether to use in-memory storage (default: False)
+            grpc_port: Qdrant server gRPC port (if using remote, default: 6334)
+            pool_size: Number of gRPC channels kept open to the remote server (default: 64)
         """
-        self.collections = {}
+        # Known collections, mapped to whether they use the old placeholder vector
+        self.collections: Dict[str, bool] = {}
         
         # Setup client based on configuration
         if host and port:
-            # Use remote Qdrant instance
-            self.client = QdrantClient(host=host, port=port)
-            logger.info(f"Connected to remote Qdrant server at {host}:{port}")
+            # Use remote Qdrant instance over gRPC, with a pool of channels so
+            # concurrent scrolls and upserts don't queue behind one connection
+            self.client = QdrantClient(
+                host=host,
+                port=port,
+                grpc_port=grpc_port,
+                prefer_grpc=True,
+                pool_size=pool_size,
+                timeout=60
+            )
+            logger.info(f"Connected to remote Qdrant server at {host}:{grpc_port} (gRPC)")
         elif in_memory:
             # Use in-memory storage
             self.client = QdrantClient(location=":memory:")
@@ -53,29 +75,44 @@ class QdrantStore:
     
     def _get_or_create_collection(self, collection_name: str) -> None:
         """Ensure collection exists, creating it if necessary."""
+        if collection_name in self.collections:
+            return
+        
         try:
-            # Check if collection exists
-            collections = self.client.get_collections().collections
-            collection_names = [collection.name for collection in collections]
-            
-            if collection_name not in collection_names:
-                # Create collection with necessary vectors and payload schema
+            if not self.client.collection_exists(collection_name=collection_name):
+                # Create a payload-only collection (no vectors, since we're just using Qdrant for metadata)
                 self.client.create_collection(
                     collection_name=collection_name,
-                    vectors_config=VectorParams(
-                        size=1,  # Placeholder vector size
-                        distance=Distance.COSINE
-                    )
+                    vectors_config={}
                 )
+                
+                # Index the payload fields used in filters so they don't scan every point;
+                # has_images stands in for "images is non-empty", which can't be indexed
+                self.client.create_payload_index(
+                    collection_name=collection_name,
+                    field_name="url",
+                    field_schema=models.PayloadSchemaType.KEYWORD
+                )
+                self.client.create_payload_index(
+                    collection_name=collection_name,
+                    field_name="has_images",
+                    field_schema=models.PayloadSchemaType.BOOL
+                )
+                self.collections[collection_name] = False
                 logger.info(f"Created new Qdrant collection: {collection_name}")
             else:
+                self.collections[collection_name] = self._uses_placeholder_vector(collection_name)
                 logger.info(f"Using existing Qdrant collection: {collection_name}")
                 
         except Exception as e:
             logger.error(f"Error creating Qdrant collection {collection_name}: {str(e)}")
             raise
     
-    def add_metadata(self, collection_name: str, documents: List[Dict]) -> bool:
+    def _uses_placeholder_vector(self, collection_name: str) -> bool:
+        """Check whether a collection was created with the old 1-d placeholder vector."""
+        return bool(self.client.get_collection(collection_name=collection_name).config.params.vectors)
+    
+    def add_metadata(self, collection_name: str, documents: List[Dict]) -> Tuple[bool, int]:
         """
         Add metadata to the Qdrant store.
         
@@ -84,66 +121,77 @@ class QdrantStore:
             documents: List of document metadata to add
             
         Returns:
-            Success status
+            Tuple of (success status, number of images stored)
         """
         try:
             # Ensure collection exists
             self._get_or_create_collection(collection_name)
             
-            # Process and upload metadata in batches
-            batch_size = 100
-            points = []
+            # Build ids and payloads as parallel lists instead of one PointStruct per document
+            indexed_at = time.time()
+            image_count = 0
+            ids = []
+            payloads = []
             
-            for i, doc in enumerate(documents):
-                # Extract metadata to store
-                metadata = doc.get('metadata', {})
-                url = doc.get('url', '')
+            for doc in documents:
+                # Store images with short keys and the display dimensions formatted
+                # once here, so listing them later is a plain projection
+                images = [
+                    {
+                        "s": image.get('src', ''),
+                        "a": image.get('alt', ''),
+                        "d": f"{image.get('width', 'unknown')}x{image.get('height', 'unknown')}",
+                        "t": image.get('title', '')
+                    }
+                    for image in doc.get('images', [])
+                ]
+                image_count += len(images)
                 
-                # Extract image info if available
-                images = doc.get('images', [])
+                # Random unsigned 64-bit ID (smaller than a UUID string on the wire)
+                ids.append(uuid.uuid4().int >> 64)
                 
                 # Add any other metadata fields here
-                payload = {
-                    "url": url,
-                    "metadata": metadata,
+                payloads.append({
+                    "url": doc.get('url', ''),
+                    "metadata": doc.get('metadata', {}),
                     "images": images,
-                    "indexed_at": time.time()
-                }
-                
-                # Generate a unique ID for each point
-                point_id = str(uuid.uuid4())
-                
-                # Create point with a unique ID and dummy vector (since we're just using Qdrant for metadata)
-                point = PointStruct(
-                    id=point_id,
-                    vector=[0.0],  # Dummy vector
-                    payload=payload
-                )
-                points.append(point)
-                
-                # Upload in batches
-                if len(points) >= batch_size or i == len(documents) - 1:
-                    if points:  # Make sure points list is not empty
-                        self.client.upsert(
-                            collection_name=collection_name,
-                            points=points
-                        )
-                        points = []  # Clear points after batch upload
+                    "has_images": bool(images),
+                    "indexed_at": indexed_at
+                })
+            
+            # Points carry no vectors, except in collections created with the placeholder vector
+            if self.collections.get(collection_name):
+                vectors = np.zeros((len(ids), 1), dtype=np.float32)
+            else:
+                vectors = [{}] * len(ids)
+            
+            # Small uploads (one indexing batch is a handful of pages) go out in-process;
+            # wait for the points to be applied so listings read right after indexing are complete
+            parallel = UPLOAD_PARALLEL if len(ids) >= UPLOAD_PARALLEL * UPLOAD_BATCH_SIZE else 1
+            self.client.upload_collection(
+                collection_name=collection_name,
+                vectors=vectors,
+                payload=payloads,
+                ids=ids,
+                batch_size=UPLOAD_BATCH_SIZE,
+                parallel=parallel,
+                wait=True
+            )
             
             logger.info(f"Added metadata for {len(documents)} documents to Qdrant collection {collection_name}")
-            return True
+            return True, image_count
             
         except Exception as e:
             logger.error(f"Error adding metadata to Qdrant collection {collection_name}: {str(e)}")
-            return False
+            return False, 0
     
-    def get_images(self, collection_name: str, limit: int = 100) -> List[Dict]:
+    def get_images(self, collection_name: str, limit: Optional[int] = 100) -> List[Dict]:
         """
         Retrieve all images from the collection.
         
         Args:
             collection_name: Name of the collection
-            limit: Maximum number of results to return
+            limit: Maximum number of pages (points) to read images from, or None for all
             
         Returns:
             List of image information
@@ -156,29 +204,59 @@ class QdrantStore:
                 # If collection doesn't exist, return empty list
                 return []
                 
-            # Query for all points and filter those with images in Python
-            # This approach doesn't use IsNotEmpty since it's not available
-            search_result = self.client.scroll(
-                collection_name=collection_name,
-                limit=limit,
-                with_payload=True,
-                with_vectors=False
+            # Filter on the indexed has_images flag and fetch only the fields used below;
+            # points stored before the flag existed have no has_images and are checked in Python
+            image_filter = Filter(
+                should=[
+                    FieldCondition(key="has_images", match=MatchValue(value=True)),
+                    models.IsEmptyCondition(is_empty=models.PayloadField(key="has_images"))
+                ]
             )
             
-            # Extract image information
+            # Extract image information, following the scroll cursor one bounded page at a time
             results = []
-            points, _ = search_result  # Unpack tuple (points, next_page_offset)
+            remaining = limit
+            offset = None
             
-            for point in points:
-                if "images" in point.payload and point.payload["images"]:
-                    # Only process points that have non-empty images list
-                    for image in point.payload["images"]:
-                        results.append({
-                            "url": image.get("src", ""),
-                            "alt": image.get("alt", ""),
-                            "page_url": point.payload.get("url", ""),
-                            "dimensions": f"{image.get('width', 'unknown')}x{image.get('height', 'unknown')}"
-                        })
+            while remaining is None or remaining > 0:
+                page_size = SCROLL_PAGE_SIZE if remaining is None else min(SCROLL_PAGE_SIZE, remaining)
+                points, offset = self.client.scroll(
+                    collection_name=collection_name,
+                    scroll_filter=image_filter,
+                    limit=page_size,
+                    offset=offset,
+                    with_payload=models.PayloadSelectorInclude(include=["images", "url", "indexed_at"]),
+                    with_vectors=False
+                )
+                
+                for point in points:
+                    if "images" in point.payload and point.payload["images"]:
+                        # Only process points that have non-empty images list
+                        page_url = point.payload.get("url", "")
+                        indexed_at = point.payload.get("indexed_at", 0)
+                        for image in point.payload["images"]:
+                            if "s" in image:
+                                results.append({
+                                    "url": image["s"],
+                                    "alt": image["a"],
+                                    "page_url": page_url,
+                                    "indexed_at": indexed_at,
+                                    "dimensions": image["d"]
+                                })
+                            else:
+                                # Points stored before the short image keys
+                                results.append({
+                                    "url": image.get("src", ""),
+                                    "alt": image.get("alt", ""),
+                                    "page_url": page_url,
+                                    "indexed_at": indexed_at,
+                                    "dimensions": f"{image.get('width', 'unknown')}x{image.get('height', 'unknown')}"
+                                })
+                
+                if remaining is not None:
+                    remaining -= len(points)
+                if offset is None:
+                    break
             
             return results
             
@@ -209,7 +287,7 @@ class QdrantStore:
                 limit=1,
                 with_payload=True,
                 with_vectors=False,
-                filter=Filter(
+                scroll_filter=Filter(
                     must=[
                         FieldCondition(
                             key="url",
@@ -228,6 +306,22 @@ class QdrantStore:
             logger.error(f"Error searching Qdrant collection {collection_name} by URL: {str(e)}")
             return None
     
+    def collection_exists(self, collection_name: str) -> bool:
+        """Check whether a collection exists without listing all collections."""
+        try:
+            return self.client.collection_exists(collection_name=collection_name)
+        except Exception as e:
+            logger.error(f"Error checking Qdrant collection {collection_name}: {str(e)}")
+            return False
+    
+    def get_document_count(self, collection_name: str) -> int:
+        """Get the number of documents (one point per page) stored in a collection."""
+        try:
+            return self.client.count(collection_name=collection_name, exact=True).count
+        except Exception as e:
+            logger.warning(f"Could not count Qdrant collection {collection_name}: {str(e)}")
+            return 0
+    
     def get_collections(self) -> List[str]:
         """Get all collection names in the Qdrant store."""
         try:
@@ -241,6 +335,7 @@ class QdrantStore:
         """Delete a collection from the Qdrant store."""
         try:
             self.client.delete_collection(collection_name=collection_name)
+            self.collections.pop(collection_name, None)
             logger.info(f"Deleted Qdrant collection: {collection_name}")
             return True
         except Exception as e:
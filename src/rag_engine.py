@@ -3,11 +3,20 @@ RAG Engine that combines scraping, vector storage, metadata storage, and LLM gen
 Provides a unified interface for the RAG pipeline with enhanced image handling.
 """
 
+import asyncio
+import contextlib
 import logging
-from typing import List, Dict, Optional, Any, Tuple, Union
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from html import escape
+from typing import List, Dict, Optional, Any, Tuple, Union, AsyncIterator
 from urllib.parse import urlparse
 import time
 
+import numpy as np
+
 from .scraper import WebScraper
 from .vectorstore import VectorStore
 from .qdrant_store import QdrantStore
@@ -17,6 +26,85 @@ from .gemini_client import GeminiClient
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Sort options for image listings: image column to sort on and whether to sort descending
+IMAGE_SORT_KEYS = {
+    "newest": ("indexed_at", True),
+    "oldest": ("indexed_at", False),
+    "size_desc": ("file_size", True),
+    "size_asc": ("file_size", False),
+    "alpha": ("alt", False),
+}
+
+# Number of scraped pages written to the stores together while crawling continues
+INDEX_BATCH_SIZE = 8
+
+# Scraped pages the crawl may run ahead of storage before it waits
+PAGE_QUEUE_SIZE = 4 * INDEX_BATCH_SIZE
+
+# Phrases that turn a question into an image request (matched anywhere, case-insensitive)
+IMAGE_QUERY_PATTERN = re.compile(r"image|picture|photo|show me|display|visual", re.IGNORECASE)
+
+# Image types counted in image summaries (matched anywhere in the lowercased alt text)
+IMAGE_TYPE_PATTERN = re.compile(r"logo|banner|product|icon|photo|thumbnail|chart|graph")
+
+# Number of collections fetched per page when streaming collection listings
+COLLECTION_PAGE_SIZE = 100
+
+# Reply used when retrieval finds nothing for a question
+NO_RESULTS_MESSAGE = "I couldn't find any relevant information to answer your question. Please try asking something related to the website content."
+
+# Maximum number of filtered image listings kept in memory
+IMAGE_QUERY_CACHE_SIZE = 128
+
+# Seconds a get_collections result is reused before asking both stores again
+COLLECTIONS_CACHE_TTL = 5.0
+
+# Maximum number of collections whose image columns are kept in memory
+IMAGE_COLUMNS_CACHE_SIZE = 16
+
+# HTML fragments for the image grid shown in chat responses
+IMAGE_GRID_HEADER = """
+        <div style="margin-top: 20px; margin-bottom: 20px;">
+            <h3 style="margin-bottom: 10px;">Images from {collection_name} ({count} found)</h3>
+            <div style="display: grid; grid-template-columns: repeat(3, 1fr); gap: 10px;">
+        """
+
+IMAGE_TILE_TEMPLATE = """
+            <div style="border: 1px solid #ddd; border-radius: 8px; overflow: hidden;">
+                <div style="height: 120px; overflow: hidden; background-color: #f0f0f0; position: relative;">
+                    <img src="{img_url}" alt="{img_alt}" style="width: 100%; height: 100%; object-fit: cover;">
+                </div>
+                <div style="padding: 8px; font-size: 12px;">
+                    <p style="margin: 0; font-weight: bold; white-space: nowrap; overflow: hidden; text-overflow: ellipsis;">{img_alt}</p>
+                    <p style="margin: 0; color: #777; font-size: 10px;">{dimensions}</p>
+                    <div style="display: flex; justify-content: space-between; margin-top: 5px;">
+                        <a href="{img_url}" target="_blank" style="text-decoration: none; color: #0066cc; font-size: 11px;">Download</a>
+                        <a href="{page_url}" target="_blank" style="text-decoration: none; color: #666; font-size: 11px;">Source</a>
+                    </div>
+                </div>
+            </div>
+            """
+
+IMAGE_GRID_CLOSE = """
+            </div>
+        """
+
+IMAGE_VIEW_ALL_TEMPLATE = """
+            <div style="margin-top: 10px; text-align: center;">
+                <a href="{base_url}/images/{collection_name}" target="_blank" style="text-decoration: none; color: #0066cc;">
+                    View all {count} images
+                </a>
+            </div>
+            """
+
+@lru_cache(maxsize=1024)
+def _domain_of(url: str) -> str:
+    """Extract the domain name from a URL, without a leading 'www.'."""
+    domain = urlparse(url).netloc
+    if domain.startswith('www.'):
+        domain = domain[4:]
+    return domain
+
 class RAGEngine:
     """
     Retrieval-Augmented Generation engine for website content.
@@ -28,6 +116,9 @@ class RAGEngine:
                  max_pages: int = 50,
                  vector_persist_directory: str = "./chroma_db",
                  metadata_persist_directory: str = "./qdrant_db",
+                 metadata_host: Optional[str] = None,
+                 metadata_port: int = 6333,
+                 scrape_cache_path: Optional[str] = "./scrape_cache.db",
                  gemini_api_key: Optional[str] = None,
                  base_url: str = "http://localhost:8000"):
         """
@@ -38,13 +129,16 @@ class RAGEngine:
             max_pages: Maximum pages to scrape (default: 50)
             vector_persist_directory: Directory for vector store (default: "./chroma_db")
             metadata_persist_directory: Directory for metadata store (default: "./qdrant_db")
+            metadata_host: Remote Qdrant host; the local directory is used when None (default: None)
+            metadata_port: Remote Qdrant port (default: 6333)
+            scrape_cache_path: File for caching scraped pages between crawls, or None to disable (default: "./scrape_cache.db")
             gemini_api_key: API key for Gemini (default: from environment)
             base_url: Base URL for application (default: "http://localhost:8000")
         """
         # Initialize dependencies
-        self.scraper = WebScraper(max_depth=max_depth, max_pages=max_pages)
+        self.scraper = WebScraper(max_depth=max_depth, max_pages=max_pages, cache_path=scrape_cache_path)
         self.vector_store = VectorStore(persist_directory=vector_persist_directory)
-        self.metadata_store = QdrantStore(path=metadata_persist_directory)
+        self.metadata_store = QdrantStore(host=metadata_host, port=metadata_port, path=metadata_persist_directory)
         self.gemini_client = GeminiClient(api_key=gemini_api_key)
         
         # Configuration
@@ -55,22 +149,35 @@ class RAGEngine:
         # Keep track of indexed websites
         self.indexed_websites = {}
         
+        # Per-collection image columns, and sorted matching indices keyed by
+        # (collection, search, category, sort)
+        self._image_columns: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._image_queries: "OrderedDict[Tuple, np.ndarray]" = OrderedDict()
+        self._image_queries_lock = threading.Lock()
+        
+        # (expiry, names) from the last get_collections call
+        self._collections_cache: Optional[Tuple[float, List[str]]] = None
+        
         logger.info("Initialized RAG Engine with ChromaDB and Qdrant storage")
     
+    async def close(self) -> None:
+        """Release network connections and worker processes held by the engine's clients."""
+        await self.gemini_client.close()
+        self.scraper.close()
+    
     def _get_domain_name(self, url: str) -> str:
         """Extract domain name from URL."""
-        parsed_url = urlparse(url)
-        domain = parsed_url.netloc
-        if domain.startswith('www.'):
-            domain = domain[4:]
-        return domain
+        return _domain_of(url)
     
-    async def index_website(self, url: str) -> Tuple[str, int]:
+    async def index_website(self, url: str, max_depth: Optional[int] = None,
+                            max_pages: Optional[int] = None) -> Tuple[str, int]:
         """
         Index a website by scraping content and storing in vector DB and metadata store.
         
         Args:
             url: URL to index
+            max_depth: Maximum crawl depth (default: the scraper's max_depth)
+            max_pages: Maximum pages to crawl (default: the scraper's max_pages)
             
         Returns:
             Tuple of (collection_name, document_count)
@@ -78,22 +185,64 @@ class RAGEngine:
         start_time = time.time()
         logger.info(f"Starting indexing of website: {url}")
         
-        # Scrape the website
-        scraped_documents = self.scraper.scrape_url(url)
-        
-        if not scraped_documents:
-            logger.warning(f"No content found at {url}")
-            return None, 0
-        
         # Generate a collection name
         domain_name = self._get_domain_name(url)
         collection_name = f"{domain_name}_{int(start_time)}"
+        previous_collection = await asyncio.to_thread(self._previous_collection, domain_name, collection_name)
         
-        # Add documents to vector store for text search
-        self.vector_store.add_documents(scraped_documents, collection_name)
+        # Crawl in a separate task and hand pages over as they are scraped,
+        # so fetching the next pages overlaps with embedding and storing earlier ones
+        # The queue is bounded, so a slow store makes the crawl wait instead of buffering the site
+        page_queue: asyncio.Queue = asyncio.Queue(maxsize=PAGE_QUEUE_SIZE)
         
-        # Add metadata to Qdrant store for rich media and structured data
-        self.metadata_store.add_metadata(collection_name, scraped_documents)
+        async def scrape_pages() -> None:
+            cancelled = False
+            try:
+                async for document in self.scraper.iter_pages(url, max_depth, max_pages):
+                    await page_queue.put(document)
+            except asyncio.CancelledError:
+                cancelled = True
+                raise
+            finally:
+                # Mark the end of the crawl, unless the consumer cancelled it and stopped reading
+                if not cancelled:
+                    await page_queue.put(None)
+        
+        scraper_task = asyncio.ensure_future(scrape_pages())
+        
+        scraped_documents = []
+        image_count = 0
+        batch = []
+        try:
+            while True:
+                document = await page_queue.get()
+                if document is not None:
+                    batch.append(document)
+                if batch and (document is None or len(batch) >= INDEX_BATCH_SIZE):
+                    image_count += await self._store_documents(collection_name, batch, previous_collection)
+                    scraped_documents.extend(batch)
+                    batch = []
+                if document is None:
+                    break
+            
+            # Surface scraper errors such as an invalid start URL
+            await scraper_task
+        finally:
+            # Stop the crawl if storing failed or the request was cancelled, and collect
+            # its outcome so the error is never left unretrieved
+            scraper_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError, Exception):
+                await scraper_task
+            
+            # The collection now exists in both stores if any page was stored
+            self._collections_cache = None
+        
+        if not scraped_documents:
+            logger.warning(f"No content found at {url}")
+            return None, 0
+        
+        # Any cached image listings for this collection are now stale
+        self._invalidate_image_queries(collection_name)
         
         # Record website metadata
         self.indexed_websites[collection_name] = {
@@ -101,7 +250,7 @@ class RAGEngine:
             'document_count': len(scraped_documents),
             'indexed_at': start_time,
             'domain': domain_name,
-            'image_count': sum(len(doc.get('images', [])) for doc in scraped_documents)
+            'image_count': image_count
         }
         
         elapsed_time = time.time() - start_time
@@ -109,7 +258,28 @@ class RAGEngine:
         
         return collection_name, len(scraped_documents)
     
-    async def query(self, question: str, collection_name: str, top_k: int = 5) -> str:
+    def _previous_collection(self, domain_name: str, collection_name: str) -> Optional[str]:
+        """Return the most recent earlier collection for the same domain, if any."""
+        previous = None
+        previous_time = -1
+        for name in self.vector_store.get_collections():
+            domain, _, timestamp = name.rpartition('_')
+            if domain == domain_name and timestamp.isdigit() and name != collection_name and int(timestamp) > previous_time:
+                previous, previous_time = name, int(timestamp)
+        return previous
+    
+    async def _store_documents(self, collection_name: str, documents: List[Dict],
+                               previous_collection: Optional[str] = None) -> int:
+        """Write a batch of scraped documents to both stores and return the number of images stored."""
+        # The two stores are independent, so write to both at once: documents go to the
+        # vector store for text search and metadata to Qdrant for rich media and structured data
+        _, (_, image_count) = await asyncio.gather(
+            asyncio.to_thread(self.vector_store.add_documents, documents, collection_name, previous_collection),
+            asyncio.to_thread(self.metadata_store.add_metadata, collection_name, documents)
+        )
+        return image_count
+    
+    async def query(self, question: str, collection_name: str, top_k: int = 5, prefilter: Optional[str] = None) -> str:
         """
         Query the RAG system with a question.
         
@@ -117,13 +287,14 @@ class RAGEngine:
             question: User question
             collection_name: Vector store collection to query
             top_k: Number of documents to retrieve (default: 5)
+            prefilter: Candidate prefilter for retrieval, e.g. "bm25" (optional)
             
         Returns:
             Generated answer
         """
-        return await self.handle_query(question, collection_name, top_k)
+        return await self.handle_query(question, collection_name, top_k, prefilter)
     
-    async def handle_query(self, question: str, collection_name: str, top_k: int = 5) -> str:
+    async def handle_query(self, question: str, collection_name: str, top_k: int = 5, prefilter: Optional[str] = None) -> str:
         """
         Process a query and generate a response.
         
@@ -131,6 +302,7 @@ class RAGEngine:
             question: User's question or query
             collection_name: Name of the collection to query
             top_k: Number of documents to retrieve
+            prefilter: "bm25" to narrow retrieval to keyword matches first (optional)
             
         Returns:
             Response text
@@ -139,20 +311,13 @@ class RAGEngine:
         logger.info(f"Processing query: '{question}' on collection '{collection_name}'")
         
         # Check if this is an image-related query
-        image_keywords = ["image", "picture", "photo", "show me", "display", "visual"]
-        is_image_query = any(keyword in question.lower() for keyword in image_keywords)
-        
-        if is_image_query:
+        if self._is_image_query(question):
             return await self._handle_image_query(question, collection_name)
         
         # Regular text query - retrieve relevant documents
-        retrieved_docs = self.vector_store.search(question, collection_name, top_k)
-        
-        if not retrieved_docs:
-            return "I couldn't find any relevant information to answer your question. Please try asking something related to the website content."
-        
-        # Create context from retrieved documents
-        context = self.gemini_client.create_context_prompt(retrieved_docs)
+        context = await self._retrieve_context(question, collection_name, top_k, prefilter)
+        if context is None:
+            return NO_RESULTS_MESSAGE
         
         # Generate response
         response = await self.gemini_client.generate_response(question, context)
@@ -162,6 +327,52 @@ class RAGEngine:
         
         return response
     
+    async def stream_query(self, question: str, collection_name: str, top_k: int = 5, prefilter: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        Process a query and stream the response as it is generated.
+        
+        Args:
+            question: User's question or query
+            collection_name: Name of the collection to query
+            top_k: Number of documents to retrieve
+            prefilter: "bm25" to narrow retrieval to keyword matches first (optional)
+            
+        Yields:
+            Chunks of the response text
+        """
+        logger.info(f"Streaming query: '{question}' on collection '{collection_name}'")
+        
+        # Image responses are assembled locally and sent as a single chunk
+        if self._is_image_query(question):
+            yield await self._handle_image_query(question, collection_name)
+            return
+        
+        context = await self._retrieve_context(question, collection_name, top_k, prefilter)
+        if context is None:
+            yield NO_RESULTS_MESSAGE
+            return
+        
+        async for chunk in self.gemini_client.stream_response(question, context):
+            yield chunk
+    
+    def _is_image_query(self, question: str) -> bool:
+        """Check whether a question asks for images."""
+        return IMAGE_QUERY_PATTERN.search(question) is not None
+    
+    async def _retrieve_context(self, question: str, collection_name: str, top_k: int, prefilter: Optional[str] = None) -> Optional[str]:
+        """
+        Retrieve relevant documents and format them as prompt context.
+        
+        Returns:
+            Context string, or None if no relevant documents were found
+        """
+        retrieved_docs = await asyncio.to_thread(self.vector_store.search, question, collection_name, top_k, prefilter)
+        
+        if not retrieved_docs:
+            return None
+        
+        return self.gemini_client.create_context_prompt(retrieved_docs)
+    
     async def _handle_image_query(self, question: str, collection_name: str) -> str:
         """
         Handle queries specifically asking for images.
@@ -176,8 +387,8 @@ class RAGEngine:
         # Get base URL from configuration
         base_url = self.config.get("base_url", "http://localhost:8000")
         
-        # Get images from the metadata store
-        images = self.metadata_store.get_images(collection_name)
+        # Get images from the metadata store, scrolling in a worker thread so other requests keep running
+        images = await asyncio.to_thread(self.metadata_store.get_images, collection_name)
         
         # Generate a response with the images
         return self._generate_image_response(collection_name, images, base_url)
@@ -201,53 +412,27 @@ class RAGEngine:
         # Limit to the first 6 images for the chat display
         display_images = images[:6]
         
-        # Create HTML for image display
-        html = f"""
-        <div style="margin-top: 20px; margin-bottom: 20px;">
-            <h3 style="margin-bottom: 10px;">Images from {collection_name} ({len(images)} found)</h3>
-            <div style="display: grid; grid-template-columns: repeat(3, 1fr); gap: 10px;">
-        """
+        # Collect the fragments and join them once at the end
+        parts = [IMAGE_GRID_HEADER.format(collection_name=collection_name, count=len(images))]
         
-        # Add each image
+        # Add each image, escaping scraped values so they can't break out of the markup
         for img in display_images:
-            img_url = img.get("url", "")
-            img_alt = img.get("alt", "Image")
-            page_url = img.get("page_url", "")
-            dimensions = img.get("dimensions", "unknown")
-            
-            html += f"""
-            <div style="border: 1px solid #ddd; border-radius: 8px; overflow: hidden;">
-                <div style="height: 120px; overflow: hidden; background-color: #f0f0f0; position: relative;">
-                    <img src="{img_url}" alt="{img_alt}" style="width: 100%; height: 100%; object-fit: cover;">
-                </div>
-                <div style="padding: 8px; font-size: 12px;">
-                    <p style="margin: 0; font-weight: bold; white-space: nowrap; overflow: hidden; text-overflow: ellipsis;">{img_alt}</p>
-                    <p style="margin: 0; color: #777; font-size: 10px;">{dimensions}</p>
-                    <div style="display: flex; justify-content: space-between; margin-top: 5px;">
-                        <a href="{img_url}" target="_blank" style="text-decoration: none; color: #0066cc; font-size: 11px;">Download</a>
-                        <a href="{page_url}" target="_blank" style="text-decoration: none; color: #666; font-size: 11px;">Source</a>
-                    </div>
-                </div>
-            </div>
-            """
+            parts.append(IMAGE_TILE_TEMPLATE.format_map({
+                "img_url": escape(img.get("url", "")),
+                "img_alt": escape(img.get("alt", "Image")),
+                "page_url": escape(img.get("page_url", "")),
+                "dimensions": escape(img.get("dimensions", "unknown"))
+            }))
         
-        html += """
-            </div>
-        """
+        parts.append(IMAGE_GRID_CLOSE)
         
         # Add link to view all images if there are more than displayed
         if len(images) > len(display_images):
-            html += f"""
-            <div style="margin-top: 10px; text-align: center;">
-                <a href="{base_url}/images/{collection_name}" target="_blank" style="text-decoration: none; color: #0066cc;">
-                    View all {len(images)} images
-                </a>
-            </div>
-            """
+            parts.append(IMAGE_VIEW_ALL_TEMPLATE.format(base_url=base_url, collection_name=collection_name, count=len(images)))
         
-        html += "</div>"
+        parts.append("</div>")
         
-        return html
+        return "".join(parts)
     
     def _generate_image_response(self, collection_name, images, base_url=""):
         """
@@ -267,10 +452,9 @@ class RAGEngine:
         # Create a summary of the images
         image_types = {}
         for img in images:
-            alt = img.get("alt", "").lower()
-            for keyword in ["logo", "banner", "product", "icon", "photo", "thumbnail", "chart", "graph"]:
-                if keyword in alt:
-                    image_types[keyword] = image_types.get(keyword, 0) + 1
+            # Count each image type at most once per image
+            for keyword in set(IMAGE_TYPE_PATTERN.findall(img.get("alt", "").lower())):
+                image_types[keyword] = image_types.get(keyword, 0) + 1
         
         # Create the response
         response = f"I found {len(images)} images in the collection '{collection_name}'."
@@ -300,78 +484,187 @@ class RAGEngine:
         """
         return self.metadata_store.get_images(collection_name, limit)
     
+    def query_images(self, 
+                     collection_name: str, 
+                     search: Optional[str] = None,
+                     category: Optional[str] = None,
+                     sort: Optional[str] = "newest",
+                     offset: int = 0,
+                     limit: int = 20) -> Tuple[List[Dict], int]:
+        """
+        Get a filtered and sorted page of images from a collection.
+        
+        Filtering and sorting run over per-collection NumPy columns, and the
+        resulting index order is cached per filter combination, so paging
+        through the same results only slices the cached indices.
+        
+        Args:
+            collection_name: Name of the collection
+            search: Case-insensitive substring to match against alt text (optional)
+            category: Image category to keep, "all" or None for every category
+            sort: One of the IMAGE_SORT_KEYS names (default: "newest")
+            offset: Index of the first image to return
+            limit: Maximum number of images to return
+            
+        Returns:
+            Tuple of (page of image dictionaries, total number of matching images)
+        """
+        search_term = search.lower() if search and search.strip() else None
+        if category == 'all':
+            category = None
+        key = (collection_name, search_term, category, sort)
+        
+        columns = self._get_image_columns(collection_name)
+        
+        with self._image_queries_lock:
+            indices = self._image_queries.get(key)
+            if indices is not None:
+                self._image_queries.move_to_end(key)
+        
+        if indices is None:
+            mask = np.ones(len(columns["records"]), dtype=bool)
+            if search_term:
+                mask &= np.char.find(columns["alt"], search_term) >= 0
+            if category:
+                mask &= columns["category"] == category
+            indices = np.flatnonzero(mask)
+            
+            if sort in IMAGE_SORT_KEYS:
+                column, descending = IMAGE_SORT_KEYS[sort]
+                values = columns[column][indices]
+                # Stable sorts, so equal keys keep their stored order either way
+                order = np.argsort(-values if descending else values, kind="stable")
+                indices = indices[order]
+            
+            with self._image_queries_lock:
+                self._image_queries[key] = indices
+                if len(self._image_queries) > IMAGE_QUERY_CACHE_SIZE:
+                    self._image_queries.popitem(last=False)
+        
+        records = columns["records"]
+        return [records[i] for i in indices[offset:offset + limit]], len(indices)
+    
+    def _get_image_columns(self, collection_name: str) -> Dict[str, Any]:
+        """
+        Load a collection's images once and keep the fields used for
+        filtering and sorting as column arrays alongside the records.
+        """
+        with self._image_queries_lock:
+            columns = self._image_columns.get(collection_name)
+            if columns is not None:
+                self._image_columns.move_to_end(collection_name)
+                return columns
+        
+        records = self.metadata_store.get_images(collection_name, None)
+        columns = {
+            "records": records,
+            "indexed_at": np.array([img.get('indexed_at') or 0 for img in records], dtype=np.float64),
+            "file_size": np.array([img.get('file_size') or 0 for img in records], dtype=np.float64),
+            "category": np.array([img.get('category') for img in records], dtype=object),
+            "alt": np.array([(img.get('alt') or '').lower() for img in records], dtype=str),
+        }
+        
+        with self._image_queries_lock:
+            self._image_columns[collection_name] = columns
+            if len(self._image_columns) > IMAGE_COLUMNS_CACHE_SIZE:
+                evicted, _ = self._image_columns.popitem(last=False)
+                for key in [key for key in self._image_queries if key[0] == evicted]:
+                    del self._image_queries[key]
+        
+        return columns
+    
+    def _invalidate_image_queries(self, collection_name: str) -> None:
+        """Drop cached image columns and listings for a collection."""
+        with self._image_queries_lock:
+            self._image_columns.pop(collection_name, None)
+            for key in [key for key in self._image_queries if key[0] == collection_name]:
+                del self._image_queries[key]
+    
     def get_indexed_websites(self) -> Dict:
         """Get information about indexed websites."""
         return self.indexed_websites
     
+    def get_indexed_website(self, collection_name: str) -> Optional[Dict]:
+        """Get information about a single indexed website, or None if it is not recorded."""
+        return self.indexed_websites.get(collection_name)
+    
+    def collection_exists(self, collection_name: str) -> bool:
+        """Check whether a collection exists in either store."""
+        return (self.vector_store.collection_exists(collection_name)
+                or self.metadata_store.collection_exists(collection_name))
+    
     def get_collections(self) -> List[str]:
-        """Get all available collections from both stores."""
+        """Get all available collections from both stores, cached for a few seconds."""
+        cached = self._collections_cache
+        if cached is not None and cached[0] > time.monotonic():
+            return list(cached[1])
+        
         vector_collections = self.vector_store.get_collections()
         metadata_collections = self.metadata_store.get_collections()
         
-        # Return unique collection names from both stores
-        return list(set(vector_collections + metadata_collections))
+        # Unique collection names from both stores, in first-seen order
+        collections = list(dict.fromkeys(vector_collections + metadata_collections))
+        self._collections_cache = (time.monotonic() + COLLECTIONS_CACHE_TTL, collections)
+        return list(collections)
+    
+    async def iter_collections(self, page_size: int = COLLECTION_PAGE_SIZE) -> AsyncIterator[str]:
+        """
+        Yield the names of all collections from both stores, one page at a time.
+        
+        Args:
+            page_size: Number of vector store collections fetched per request
+            
+        Yields:
+            Unique collection names
+        """
+        seen = set()
+        offset = 0
+        while True:
+            page = await asyncio.to_thread(self.vector_store.get_collections, page_size, offset)
+            for name in page:
+                if name not in seen:
+                    seen.add(name)
+                    yield name
+            if len(page) < page_size:
+                break
+            offset += page_size
+        
+        # Qdrant has no paged listing; only yield the names Chroma did not report
+        for name in await asyncio.to_thread(self.metadata_store.get_collections):
+            if name not in seen:
+                seen.add(name)
+                yield name
     
-    def delete_collection(self, collection_name: str) -> bool:
+    async def delete_collection(self, collection_name: str) -> bool:
         """Delete a collection and its data from both stores."""
-        vector_result = self.vector_store.delete_collection(collection_name)
-        metadata_result = self.metadata_store.delete_collection(collection_name)
+        # The stores are independent, so delete from both at once
+        vector_result, metadata_result = await asyncio.gather(
+            asyncio.to_thread(self.vector_store.delete_collection, collection_name),
+            asyncio.to_thread(self.metadata_store.delete_collection, collection_name)
+        )
+        self._invalidate_image_queries(collection_name)
+        self._collections_cache = None
         
         if collection_name in self.indexed_websites:
             del self.indexed_websites[collection_name]
             
         return vector_result and metadata_result
     
-    # Add this method to your RAGEngine class in src/rag_engine.py
-
-def get_collection_size(self, collection_name: str) -> int:
-    """
-    Get the number of documents in a collection.
-    
-    Args:
-        collection_name: Name of the collection
+    def get_collection_size(self, collection_name: str) -> int:
+        """
+        Get the number of documents in a collection.
         
-    Returns:
-        int: Number of documents in the collection or 0 if not found
-    """
-    try:
-        # First try to get from metadata if available
-        indexed_websites = self.get_indexed_websites()
-        if collection_name in indexed_websites:
-            return indexed_websites[collection_name].get("document_count", 0)
-            
-        # If not in metadata, try to get directly from the vector store
-        # This approach depends on your specific vector store implementation
-        if hasattr(self, 'vector_store') and self.vector_store:
-            # If using ChromaDB
-            try:
-                # For ChromaDB
-                collection = self.vector_store.get_collection(collection_name)
-                if collection:
-                    return collection.count()
-            except Exception as e:
-                logger.warning(f"Could not get collection size from ChromaDB: {str(e)}")
-                
-        # If using Qdrant
-        try:
-            if hasattr(self, 'metadata_store') and self.metadata_store:
-                count = self.metadata_store.get_document_count(collection_name)
-                if count > 0:
-                    return count
-        except Exception as e:
-            logger.warning(f"Could not get collection size from Qdrant: {str(e)}")
-            
-        # If we couldn't get the count, check if collection directory exists
-        # and estimate from files (this is a fallback approach)
-        import os
-        if hasattr(self, 'vector_store') and hasattr(self.vector_store, 'persist_directory'):
-            vector_db_path = os.path.join(self.vector_store.persist_directory, collection_name)
-            if os.path.exists(vector_db_path) and os.path.isdir(vector_db_path):
-                # Collection exists, but we can't get exact count
-                # Return 1 as a placeholder to indicate it's not empty
-                return 1
+        Args:
+            collection_name: Name of the collection
             
-        return 0
-    except Exception as e:
-        logger.error(f"Error getting collection size: {str(e)}")
-        return 0
\ No newline at end of file
+        Returns:
+            int: Number of documents in the collection or 0 if not found
+        """
+        # First try to get from metadata if available
+        website = self.indexed_websites.get(collection_name)
+        if website is not None:
+            return website.get("document_count", 0)
+        
+        # Otherwise count the metadata points, which are stored one per scraped page
+        # (the vector store holds chunks, so its count would overstate the pages)
+        return self.metadata_store.get_document_count(collection_name)
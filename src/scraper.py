@@ -3,23 +3,43 @@ Website scraper module for extracting content from URLs.
 Handles recursive crawling with depth control and image extraction.
 """
 
-import re
+import os
+import json
+import asyncio
 import logging
-from urllib.parse import urljoin, urlparse
-from typing import List, Dict, Set, Optional, Tuple
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from typing import List, Dict, Set, Optional, Tuple, AsyncIterator
 
-import requests
-from bs4 import BeautifulSoup
+import aiohttp
 import validators
 
+from .page_cache import PageCache
+from .page_parser import cached_urlparse, normalize_url, is_http_url, parse_and_extract
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Bytes read from the network per chunk when streaming a page body
+FETCH_CHUNK_SIZE = 16384
+
+# Open connections allowed to a single host during a crawl
+CONNECTIONS_PER_HOST = 8
+
+# Seconds a resolved hostname is reused before DNS is queried again
+DNS_CACHE_TTL = 300
+
+# Upper bound on parse worker processes; each one is a separate interpreter
+MAX_PARSE_WORKERS = 4
+
 class WebScraper:
     """Scraper that extracts content from websites and handles recursive crawling."""
     
-    def __init__(self, max_depth: int = 2, max_pages: int = 50, timeout: int = 10):
+    def __init__(self, max_depth: int = 2, max_pages: int = 50, timeout: int = 10, concurrency: int = 20,
+                 parser: str = 'lxml', parse_workers: Optional[int] = None,
+                 max_page_bytes: int = 5 * 1024 * 1024, cache_path: Optional[str] = None):
         """
         Initialize the scraper with configuration parameters.
         
@@ -27,12 +47,22 @@ class WebScraper:
             max_depth: Maximum depth for recursive scraping (default: 2)
             max_pages: Maximum number of pages to scrape (default: 50)
             timeout: Request timeout in seconds (default: 10)
+            concurrency: Maximum number of pages fetched at the same time (default: 20)
+            parser: BeautifulSoup parser; 'html5lib' is much slower but parses exactly like a browser (default: 'lxml')
+            parse_workers: Number of processes parsing pages (default: one per CPU, at most MAX_PARSE_WORKERS)
+            max_page_bytes: Maximum number of bytes read from one page; the rest is dropped (default: 5 MB)
+            cache_path: SQLite file for caching pages between crawls, revalidated with ETag /
+                Last-Modified (default: no cache)
         """
         self.max_depth = max_depth
         self.max_pages = max_pages
         self.timeout = timeout
-        self.visited_urls: Set[str] = set()
-        self.pages_scraped = 0
+        self.concurrency = concurrency
+        self.parser = parser
+        self.parse_workers = parse_workers or min(os.cpu_count() or 1, MAX_PARSE_WORKERS)
+        self.max_page_bytes = max_page_bytes
+        self.cache = PageCache(cache_path) if cache_path else None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
         
         # Headers to mimic a browser request
         self.headers = {
@@ -43,126 +73,137 @@ class WebScraper:
     
     def _normalize_url(self, url: str) -> str:
         """Normalize URL by removing fragments and trailing slashes."""
-        parsed = urlparse(url)
-        # Remove fragments and normalize
-        normalized = f"{parsed.scheme}://{parsed.netloc}{parsed.path}"
-        # Remove trailing slash if present
-        if normalized.endswith('/'):
-            normalized = normalized[:-1]
-        return normalized
+        return normalize_url(url)
     
     def _is_valid_url(self, url: str, base_domain: str) -> bool:
         """Check if URL is valid and belongs to the same domain."""
-        if not url or not validators.url(url):
+        if not url:
             return False
         
         # Check if URL belongs to the same domain
-        parsed_url = urlparse(url)
-        parsed_base = urlparse(base_domain)
+        parsed_url = cached_urlparse(url)
+        parsed_base = cached_urlparse(base_domain)
         
-        return parsed_url.netloc == parsed_base.netloc
+        return is_http_url(parsed_url) and parsed_url.netloc == parsed_base.netloc
     
-    def _extract_text_content(self, soup: BeautifulSoup) -> str:
-        """Extract clean text content from HTML."""
-        # Remove script and style elements
-        for element in soup(["script", "style", "header", "footer", "nav"]):
-            element.decompose()
-        
-        # Get text and normalize whitespace
-        text = soup.get_text(separator=' ')
-        # Remove extra whitespace and normalize
-        text = re.sub(r'\s+', ' ', text).strip()
-        return text
+    def _get_process_pool(self) -> ProcessPoolExecutor:
+        """Create the parsing process pool on first use."""
+        if self._process_pool is None:
+            # Spawn rather than fork: the server process runs other threads
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=self.parse_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._process_pool
     
-    def _extract_links(self, soup: BeautifulSoup, base_url: str) -> List[str]:
-        """Extract all links from the page."""
-        links = []
-        base_domain = f"{urlparse(base_url).scheme}://{urlparse(base_url).netloc}"
-        
-        for a_tag in soup.find_all('a', href=True):
-            href = a_tag['href']
-            # Create absolute URL
-            abs_url = urljoin(base_url, href)
-            # Validate URL
-            if self._is_valid_url(abs_url, base_domain):
-                normalized_url = self._normalize_url(abs_url)
-                links.append(normalized_url)
-        
-        return links
+    def close(self) -> None:
+        """Shut down the parsing worker processes and close the page cache."""
+        if self._process_pool is not None:
+            self._process_pool.shutdown(cancel_futures=True)
+            self._process_pool = None
+        if self.cache is not None:
+            self.cache.close()
+            self.cache = None
     
-    def _extract_images(self, soup: BeautifulSoup, base_url: str) -> List[Dict]:
-        """Extract all images from the page with their attributes."""
-        images = []
-        
-        for img_tag in soup.find_all('img'):
-            # Skip if no src attribute
-            if not img_tag.get('src'):
-                continue
+    async def _fetch_page(self, session: aiohttp.ClientSession, semaphore: asyncio.Semaphore,
+                          url: str) -> Optional[Tuple[bytes, Optional[str], Optional[str]]]:
+        """
+        Fetch a webpage and return its raw HTML, declared charset and cached parse.
+        
+        The cached parse (JSON from the page cache) is only returned when the
+        server answers 304 Not Modified; it is None for freshly downloaded pages.
+        """
+        # Revalidate a cached copy instead of downloading it again
+        cached = await asyncio.to_thread(self.cache.get, url) if self.cache else None
+        headers = self.headers
+        if cached:
+            etag, last_modified = cached[0], cached[1]
+            headers = dict(self.headers)
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+        
+        try:
+            async with semaphore, session.get(url, headers=headers) as response:
+                if cached and response.status == 304:
+                    # Unchanged since the last crawl
+                    return cached[3], cached[2], cached[4]
                 
-            # Create absolute URL for image source
-            src = img_tag['src']
-            abs_src = urljoin(base_url, src)
-            
-            # Skip data URIs and invalid URLs
-            if abs_src.startswith('data:') or not validators.url(abs_src):
-                continue
+                response.raise_for_status()
                 
-            # Extract image attributes
-            image_info = {
-                'src': abs_src,
-                'alt': img_tag.get('alt', ''),
-                'width': img_tag.get('width', ''),
-                'height': img_tag.get('height', ''),
-                'title': img_tag.get('title', '')
-            }
+                # Check if content is HTML
+                content_type = response.headers.get('Content-Type', '')
+                if 'text/html' not in content_type.lower():
+                    logger.warning(f"Skipping non-HTML content at {url}")
+                    return None
+                
+                # Stream the body in chunks and stop at the size cap, so one huge page can't
+                # hold unbounded memory; the raw bytes go to the parser, which decodes them once
+                chunks = []
+                size = 0
+                async for chunk in response.content.iter_chunked(FETCH_CHUNK_SIZE):
+                    chunks.append(chunk)
+                    size += len(chunk)
+                    if size >= self.max_page_bytes:
+                        logger.warning(f"Truncating {url} at {self.max_page_bytes} bytes")
+                        break
+                
+                body = b"".join(chunks)[:self.max_page_bytes]
+                
+                # Only pages the server can revalidate are worth caching
+                etag = response.headers.get('ETag')
+                last_modified = response.headers.get('Last-Modified')
+                if self.cache and (etag or last_modified):
+                    await asyncio.to_thread(self.cache.put, url, etag, last_modified, response.charset, body)
+                
+                return body, response.charset, None
             
-            images.append(image_info)
-        
-        return images
-    
-    def _extract_structured_data(self, soup: BeautifulSoup) -> Dict:
-        """Extract structured data like meta tags."""
-        structured_data = {}
-        
-        # Extract title
-        title_tag = soup.find('title')
-        if title_tag:
-            structured_data['title'] = title_tag.text.strip()
-        
-        # Extract meta description
-        meta_desc = soup.find('meta', attrs={'name': 'description'})
-        if meta_desc and meta_desc.get('content'):
-            structured_data['description'] = meta_desc['content'].strip()
-        
-        # Convert heading lists to comma-separated strings instead of nested dictionaries
-        for i in range(1, 7):
-            h_tags = soup.find_all(f'h{i}')
-            if h_tags:
-                # Join the headings into a single string instead of keeping as a list
-                heading_text = ", ".join([tag.text.strip() for tag in h_tags])
-                structured_data[f'h{i}_headings'] = heading_text
-        
-        return structured_data
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error(f"Error fetching {url}: {str(e) or type(e).__name__}")
+            return None
     
-    def _fetch_page(self, url: str) -> Optional[Tuple[str, BeautifulSoup]]:
-        """Fetch a webpage and return its content."""
-        try:
-            response = requests.get(url, headers=self.headers, timeout=self.timeout)
-            response.raise_for_status()
-            
-            # Check if content is HTML
-            content_type = response.headers.get('Content-Type', '')
-            if 'text/html' not in content_type.lower():
-                logger.warning(f"Skipping non-HTML content at {url}")
-                return None
+    async def _parse_page(self, url: str, depth: int, with_links: bool, html_content: bytes,
+                          encoding: Optional[str], cached_parse: Optional[str] = None) -> Tuple[Dict, List[str]]:
+        """Parse a fetched page into a document and the links to crawl from it."""
+        # An unchanged page reuses its last parse, unless that one skipped links we now need
+        parsed = json.loads(cached_parse) if cached_parse else None
+        if parsed is not None and (parsed[3] is not None or not with_links):
+            text_content, structured_data, images, links = parsed
+            links = links or []
+        else:
+            # Parsing is CPU-bound, so run it in a worker process, outside the GIL of the event loop;
+            # extract content, images and (unless at max depth) links in one pass
+            loop = asyncio.get_running_loop()
+            text_content, structured_data, images, links = await loop.run_in_executor(
+                self._get_process_pool(),
+                parse_and_extract,
+                html_content,
+                encoding,
+                url,
+                self.parser,
+                with_links
+            )
             
-            html_content = response.text
-            soup = BeautifulSoup(html_content, 'html5lib')
-            return html_content, soup
-            
-        except requests.RequestException as e:
-            logger.error(f"Error fetching {url}: {str(e)}")
-            return None
+            # Keep the parse with the cached page; links are None when they weren't extracted
+            if self.cache:
+                parsed = [text_content, structured_data, images, links if with_links else None]
+                await asyncio.to_thread(self.cache.put_parsed, url, json.dumps(parsed))
+        
+        # Create document
+        document = {
+            'url': url,
+            'content': text_content,
+            'images': images,  # Added images
+            'metadata': {
+                **structured_data,
+                'depth': depth,
+                'html_length': len(html_content),
+                'image_count': len(images)  # Added image count
+            }
+        }
+        
+        return document, links
     
     def scrape_url(self, start_url: str) -> List[Dict]:
         """
@@ -174,74 +215,96 @@ class WebScraper:
         Returns:
             List of dictionaries containing scraped content
         """
+        async def collect() -> List[Dict]:
+            return [document async for document in self.iter_pages(start_url)]
+        
+        return asyncio.run(collect())
+    
+    async def iter_pages(self, start_url: str, max_depth: Optional[int] = None,
+                         max_pages: Optional[int] = None) -> AsyncIterator[Dict]:
+        """
+        Scrape the given URL and its linked pages, yielding each document as soon as it is scraped.
+        
+        Pages are crawled breadth-first; all pages at one depth are fetched
+        concurrently, up to the concurrency limit, before moving deeper.
+        Crawl state is local to each call, so several crawls can run at once.
+        
+        Args:
+            start_url: The URL to start scraping from
+            max_depth: Maximum depth for this crawl (default: the scraper's max_depth)
+            max_pages: Maximum number of pages for this crawl (default: the scraper's max_pages)
+            
+        Yields:
+            Dictionaries containing scraped content
+        """
         if not validators.url(start_url):
             raise ValueError(f"Invalid URL: {start_url}")
         
-        # Reset state for new scraping job
-        self.visited_urls = set()
-        self.pages_scraped = 0
+        max_depth = self.max_depth if max_depth is None else max_depth
+        max_pages = self.max_pages if max_pages is None else max_pages
+        visited_urls: Set[str] = set()
+        pages_scraped = 0
         
         # Normalize the starting URL
         start_url = self._normalize_url(start_url)
-        base_domain = f"{urlparse(start_url).scheme}://{urlparse(start_url).netloc}"
-        
-        # Initialize results list
-        results = []
         
-        # Queue for BFS (breadth-first search)
-        queue = [(start_url, 0)]  # (url, depth)
+        # One connection pool for the whole crawl, so connections and DNS lookups are reused
+        connector = aiohttp.TCPConnector(
+            limit=self.concurrency,
+            limit_per_host=CONNECTIONS_PER_HOST,
+            ttl_dns_cache=DNS_CACHE_TTL,
+            keepalive_timeout=30
+        )
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        semaphore = asyncio.Semaphore(self.concurrency)
         
-        # Scrape pages breadth-first
-        while queue and self.pages_scraped < self.max_pages:
-            url, depth = queue.pop(0)
-            
-            # Skip if already visited or exceeds max depth
-            if url in self.visited_urls or depth > self.max_depth:
-                continue
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            # Scrape pages breadth-first, one depth level (frontier) at a time
+            frontier = [start_url]
+            # URLs already placed on a frontier, so each one is queued at most once
+            enqueued = {start_url}
+            depth = 0
             
-            # Mark as visited
-            self.visited_urls.add(url)
-            
-            # Fetch page content
-            page_data = self._fetch_page(url)
-            if not page_data:
-                continue
+            while frontier and depth <= max_depth and pages_scraped < max_pages:
+                next_frontier = []
                 
-            html_content, soup = page_data
-            self.pages_scraped += 1
-            
-            # Extract content
-            text_content = self._extract_text_content(soup)
-            structured_data = self._extract_structured_data(soup)
-            
-            # Extract images - NEW
-            images = self._extract_images(soup, url)
-            
-            # Create document
-            document = {
-                'url': url,
-                'content': text_content,
-                'images': images,  # Added images
-                'metadata': {
-                    **structured_data,
-                    'depth': depth,
-                    'html_length': len(html_content),
-                    'image_count': len(images)  # Added image count
-                }
-            }
-            
-            results.append(document)
-            logger.info(f"Scraped {url} (Page {self.pages_scraped}/{self.max_pages}, Images: {len(images)})")
-            
-            # Don't crawl deeper if at max depth
-            if depth >= self.max_depth:
-                continue
+                # Fetch no more pages at once than the remaining page budget
+                pending = deque(frontier)
+                while pending and pages_scraped < max_pages:
+                    batch_size = min(len(pending), max_pages - pages_scraped)
+                    batch = [pending.popleft() for _ in range(batch_size)]
+                    
+                    # Mark as visited
+                    visited_urls.update(batch)
+                    
+                    # Fetch page content
+                    pages = await asyncio.gather(*[self._fetch_page(session, semaphore, url) for url in batch])
+                    
+                    # Parse the whole batch at once so every worker process is kept busy;
+                    # a page that fails to parse is logged and skipped instead of ending the crawl
+                    fetched = [(url, page) for url, page in zip(batch, pages) if page]
+                    parsed = await asyncio.gather(*[
+                        self._parse_page(url, depth, depth < max_depth, *page) for url, page in fetched
+                    ], return_exceptions=True)
+                    
+                    for (url, _), result in zip(fetched, parsed):
+                        if isinstance(result, Exception):
+                            logger.error(f"Error parsing {url}: {str(result) or type(result).__name__}")
+                            continue
+                        
+                        document, links = result
+                        pages_scraped += 1
+                        
+                        logger.info(f"Scraped {url} (Page {pages_scraped}/{max_pages}, Images: {len(document['images'])})")
+                        yield document
+                        
+                        # Add links to the next depth
+                        for link in links:
+                            if link not in enqueued:
+                                enqueued.add(link)
+                                next_frontier.append(link)
                 
-            # Add links to queue for next depth
-            links = self._extract_links(soup, url)
-            for link in links:
-                if link not in self.visited_urls:
-                    queue.append((link, depth + 1))
-        
-        logger.info(f"Scraping completed. Visited {len(self.visited_urls)} URLs, scraped {self.pages_scraped} pages.")
-        return results
\ No newline at end of file
+                frontier = next_frontier
+                depth += 1
+        
+        logger.info(f"Scraping completed. Visited {len(visited_urls)} URLs, scraped {pages_scraped} pages.")
\ No newline at end of file
@@ -4,17 +4,54 @@ Provides functionality for similarity search and document management.
 """
 
 import os
+import re
+import hashlib
+import time
 import logging
-from typing import List, Dict, Optional, Any, Union
+import urllib.parse
+from typing import List, Dict, Optional, Any, Union, Tuple
 
+import numpy as np
 import chromadb
 from chromadb.config import Settings
 from chromadb.utils import embedding_functions
+from chromadb.utils.embedding_functions.onnx_mini_lm_l6_v2 import ONNXMiniLM_L6_V2
+
+from .embeddings import EMBEDDING_MODEL_NAME, FastEmbedFunction
+from .keyword_index import KeywordIndex
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Characters not allowed in collection names, replaced with underscores
+COLLECTION_NAME_PATTERN = re.compile(r'[^a-zA-Z0-9]')
+
+# Tokenizer of the embedding model, used to cut chunks on token boundaries
+TOKENIZER_NAME = EMBEDDING_MODEL_NAME
+
+# Tokenizer file of Chroma's default embedding model, present once the model is downloaded
+CHROMA_TOKENIZER_PATH = os.path.join(
+    ONNXMiniLM_L6_V2.DOWNLOAD_PATH, ONNXMiniLM_L6_V2.EXTRACTED_FOLDER_NAME, "tokenizer.json"
+)
+
+# Longest input the embedding model accepts, in tokens, including [CLS] and [SEP]
+MODEL_MAX_TOKENS = 256
+
+# Chunk window and overlap in model tokens; windows leave room for the two special
+# tokens so the model never truncates the end of a chunk
+CHUNK_TOKENS = MODEL_MAX_TOKENS - 2
+CHUNK_OVERLAP_TOKENS = 64
+
+# Chunks shorter than this many characters are dropped
+MIN_CHUNK_CHARS = 100
+
+# Number of chunks embedded and added to ChromaDB per call
+ADD_BATCH_SIZE = 512
+
+# Minimum number of BM25 candidates handed to dense search when prefiltering
+BM25_MIN_CANDIDATES = 50
+
 class VectorStore:
     """Manages document vectors for efficient similarity search."""
     
@@ -39,13 +76,61 @@ class VectorStore:
             )
         )
         
-        # Use default embedding function (all-MiniLM-L6-v2)
-        self.embedding_function = embedding_functions.DefaultEmbeddingFunction()
+        # Embed all-MiniLM-L6-v2 with fastembed, falling back to Chroma's default function
+        try:
+            self.embedding_function = FastEmbedFunction()
+        except Exception as e:
+            logger.warning(f"fastembed unavailable, using default embedding function: {str(e)}")
+            self.embedding_function = embedding_functions.DefaultEmbeddingFunction()
+        
+        # Load the model now so the first indexing request doesn't pay for it
+        try:
+            self.embedding_function(["warmup"])
+        except Exception as e:
+            logger.warning(f"Could not warm up embedding model: {str(e)}")
+        
+        # Tokenizer for token-aligned chunking; None falls back to character windows
+        self.tokenizer = self._load_tokenizer()
         
         # Keep track of collections
         self.collections = {}
+        
+        # Keyword indexes for chunks added by this process, used for BM25 prefiltering
+        self.keyword_indexes: Dict[str, KeywordIndex] = {}
         logger.info(f"Initialized vector store with persistence at {persist_directory}")
     
+    def _load_tokenizer(self) -> Optional[Any]:
+        """
+        Load the embedding model's tokenizer, preferring local model caches over the HF hub.
+        
+        Returns:
+            The tokenizer, or None if it is unavailable and chunking falls back to characters
+        """
+        try:
+            from tokenizers import Tokenizer
+            tokenizer = None
+            # The embedding model has already loaded its tokenizer from disk; copy it so
+            # the changes below don't touch the model's own truncation settings
+            if isinstance(self.embedding_function, FastEmbedFunction):
+                tokenizer_json = self.embedding_function.tokenizer_json()
+                if tokenizer_json:
+                    tokenizer = Tokenizer.from_str(tokenizer_json)
+            if tokenizer is None and os.path.exists(CHROMA_TOKENIZER_PATH):
+                tokenizer = Tokenizer.from_file(CHROMA_TOKENIZER_PATH)
+            if tokenizer is None:
+                tokenizer = Tokenizer.from_pretrained(TOKENIZER_NAME)
+            # Whole documents are encoded at once, so never truncate or pad
+            tokenizer.no_truncation()
+            tokenizer.no_padding()
+            return tokenizer
+        except Exception as e:
+            logger.warning(
+                f"Could not load tokenizer {TOKENIZER_NAME}, chunking by characters instead. "
+                f"Chunk ids will differ from token-chunked crawls, so embeddings of earlier "
+                f"indexes won't be reused: {str(e)}"
+            )
+            return None
+    
     def _get_or_create_collection(self, collection_name: str) -> Any:
         """Get or create a collection for the specified URL."""
         if collection_name in self.collections:
@@ -72,18 +157,14 @@ class VectorStore:
     
     def _sanitize_collection_name(self, url: str) -> str:
         """Convert URL to a valid collection name."""
-        # Replace non-alphanumeric characters with underscores
-        import re
         # Extract domain name
-        import urllib.parse
         domain = urllib.parse.urlparse(url).netloc
         # Remove www if present
         if domain.startswith('www.'):
             domain = domain[4:]
         # Replace dots and other chars with underscores
-        collection_name = re.sub(r'[^a-zA-Z0-9]', '_', domain)
+        collection_name = COLLECTION_NAME_PATTERN.sub('_', domain)
         # Add timestamp to make unique
-        import time
         timestamp = int(time.time())
         return f"{collection_name}_{timestamp}"
 
@@ -91,52 +172,86 @@ class VectorStore:
         """
         Split document into smaller chunks for better retrieval.
         
+        Chunks are windows of CHUNK_TOKENS model tokens overlapping by
+        CHUNK_OVERLAP_TOKENS; chunk_size and chunk_overlap only apply when the
+        tokenizer could not be loaded.
+        
         Args:
             document: Document dictionary with content and metadata
-            chunk_size: Number of characters per chunk (default: 1000)
-            chunk_overlap: Number of overlapping characters (default: 200)
+            chunk_size: Number of characters per chunk without a tokenizer (default: 1000)
+            chunk_overlap: Number of overlapping characters without a tokenizer (default: 200)
             
         Returns:
             List of document chunks
         """
         content = document['content']
-        chunks = []
+        url = document['url']
+        title = document.get('metadata', {}).get('title', '')
         
-        # Simple chunk splitting by character count
-        for i in range(0, len(content), chunk_size - chunk_overlap):
-            chunk_content = content[i:i + chunk_size]
-            
-            # Skip if chunk is too small
-            if len(chunk_content) < 100:
-                continue
-            
-            # Create chunk metadata
-            # ChromaDB doesn't handle complex metadata well, so keep it simple
-            # Store only basic metadata in ChromaDB
-            chunk_metadata = {
-                "chunk_id": str(len(chunks)),
-                "source_url": document['url'],
-                "title": document.get('metadata', {}).get('title', ''),
-                "chunk_start": str(i),
-                "chunk_end": str(i + len(chunk_content))
-            }
-                
-            chunk = {
-                "content": chunk_content,
-                "metadata": chunk_metadata,
-                "url": document['url']
+        if self.tokenizer is not None:
+            starts, ends = self._token_window_bounds(content)
+        else:
+            # Simple chunk splitting by character count
+            starts = np.arange(0, len(content), chunk_size - chunk_overlap, dtype=np.int64)
+            ends = np.minimum(starts + chunk_size, len(content))
+        
+        # Skip chunks that are too small
+        keep = (ends - starts) >= MIN_CHUNK_CHARS
+        bounds = zip(starts[keep].tolist(), ends[keep].tolist())
+        
+        # ChromaDB doesn't handle complex metadata well, so keep it simple
+        # Store only basic metadata in ChromaDB
+        return [
+            {
+                "content": content[start:end],
+                "metadata": {
+                    "chunk_id": str(index),
+                    "source_url": url,
+                    "title": title,
+                    "chunk_start": str(start),
+                    "chunk_end": str(end)
+                },
+                "url": url
             }
-            chunks.append(chunk)
+            for index, (start, end) in enumerate(bounds)
+        ]
+    
+    def _token_window_bounds(self, content: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Compute character bounds of overlapping token windows over the content.
+        
+        The document is tokenized once and windows are sliced from the token
+        offsets, so chunk text is taken verbatim from the content instead of
+        being decoded back from token ids.
+        
+        Args:
+            content: Document text
             
-        return chunks
+        Returns:
+            Arrays of start and end character offsets, one entry per window
+        """
+        offsets = np.asarray(self.tokenizer.encode(content, add_special_tokens=False).offsets, dtype=np.int64)
+        token_count = len(offsets)
+        if not token_count:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        
+        # Every window after the first must reach past the previous one's overlap
+        stride = CHUNK_TOKENS - CHUNK_OVERLAP_TOKENS
+        starts = np.arange(0, max(token_count - CHUNK_OVERLAP_TOKENS, 1), stride)
+        ends = np.minimum(starts + CHUNK_TOKENS, token_count)
+        
+        return offsets[starts, 0], offsets[ends - 1, 1]
     
-    def add_documents(self, documents: List[Dict], collection_name: Optional[str] = None) -> str:
+    def add_documents(self, documents: List[Dict], collection_name: Optional[str] = None,
+                      previous_collection: Optional[str] = None) -> str:
         """
         Add documents to the vector store.
         
         Args:
             documents: List of documents to add
             collection_name: Optional name for the collection (if None, generated from first URL)
+            previous_collection: Collection from an earlier crawl of the same site; chunks found
+                there unchanged reuse its embeddings instead of being embedded again (optional)
             
         Returns:
             Name of the collection
@@ -150,34 +265,95 @@ class VectorStore:
         
         # Get or create collection
         collection = self._get_or_create_collection(collection_name)
+        previous = None
+        if previous_collection and self.collection_exists(previous_collection):
+            previous = self._get_or_create_collection(previous_collection)
+        
+        # Chunk ids hash the page URL and chunk text, so a chunk keeps its id across crawls
+        seen_ids = set()
+        chunk_count = 0
+        reused_count = 0
+        
+        # Stream chunks into reusable batch buffers, flushing each time one fills up
+        ids: List[str] = []
+        texts: List[str] = []
+        metadatas: List[Dict] = []
         
-        # Process documents into chunks
-        all_chunks = []
         for doc in documents:
-            chunks = self.create_document_chunks(doc)
-            all_chunks.extend(chunks)
+            for chunk in self.create_document_chunks(doc):
+                chunk_id = hashlib.sha1(f"{chunk['url']}\0{chunk['content']}".encode('utf-8')).hexdigest()
+                if chunk_id in seen_ids:
+                    continue
+                seen_ids.add(chunk_id)
+                
+                ids.append(chunk_id)
+                texts.append(chunk['content'])
+                metadatas.append(chunk['metadata'])
+                
+                if len(ids) >= ADD_BATCH_SIZE:
+                    added, reused = self._add_batch(collection, collection_name, ids, texts, metadatas, previous)
+                    chunk_count += added
+                    reused_count += reused
+                    ids.clear()
+                    texts.clear()
+                    metadatas.clear()
+        
+        if ids:
+            added, reused = self._add_batch(collection, collection_name, ids, texts, metadatas, previous)
+            chunk_count += added
+            reused_count += reused
         
-        # Add documents in batches to avoid memory issues
-        batch_size = 100
-        for i in range(0, len(all_chunks), batch_size):
-            batch = all_chunks[i:i + batch_size]
+        logger.info(f"Added {chunk_count} chunks ({reused_count} with embeddings reused from the previous crawl, "
+                    f"{len(seen_ids) - chunk_count} already stored) from {len(documents)} documents to collection {collection_name}")
+        return collection_name
+    
+    def _add_batch(self, collection: Any, collection_name: str, ids: List[str], texts: List[str],
+                   metadatas: List[Dict], previous: Optional[Any] = None) -> Tuple[int, int]:
+        """
+        Add one batch of chunks to the collection and to its keyword index.
+        
+        Chunks whose ids are already in the collection are skipped, and chunks
+        found in the previous collection copy its embeddings, so only new
+        content is embedded.
+        
+        Returns:
+            Tuple of (chunks added to the collection, of which had embeddings reused)
+        """
+        existing = set(collection.get(ids=ids, include=[])["ids"])
+        new = [i for i, chunk_id in enumerate(ids) if chunk_id not in existing]
+        reused = 0
+        
+        if new:
+            new_ids = [ids[i] for i in new]
+            new_texts = [texts[i] for i in new]
             
-            # Prepare data for ChromaDB
-            ids = [f"{collection_name}_{i + j}" for j in range(len(batch))]
-            texts = [chunk['content'] for chunk in batch]
-            metadatas = [chunk['metadata'] for chunk in batch]
+            # Chunks unchanged since the previous crawl keep their stored embeddings
+            stored = {}
+            if previous is not None:
+                found = previous.get(ids=new_ids, include=["embeddings"])
+                stored = dict(zip(found["ids"], found["embeddings"]))
+            reused = len(stored)
             
-            # Add to collection
-            collection.add(
-                ids=ids,
-                documents=texts,
-                metadatas=metadatas
-            )
+            # Embed the rest in one call rather than leaving it to the collection
+            to_embed = [text for chunk_id, text in zip(new_ids, new_texts) if chunk_id not in stored]
+            computed = iter(self.embedding_function(to_embed) if to_embed else [])
+            embeddings = [stored[chunk_id] if chunk_id in stored else next(computed) for chunk_id in new_ids]
             
-        logger.info(f"Added {len(all_chunks)} chunks from {len(documents)} documents to collection {collection_name}")
-        return collection_name
+            collection.upsert(
+                ids=new_ids,
+                documents=new_texts,
+                metadatas=[metadatas[i] for i in new],
+                embeddings=embeddings
+            )
+        
+        # Index the same chunks for keyword prefiltering, including stored ones this process hasn't seen
+        keyword_index = self.keyword_indexes.setdefault(collection_name, KeywordIndex())
+        for chunk_id, text in zip(ids, texts):
+            keyword_index.add(chunk_id, text)
+        
+        return len(new), reused
     
-    def search(self, query: str, collection_name: str, top_k: int = 5) -> List[Dict]:
+    def search(self, query: str, collection_name: str, top_k: int = 5, prefilter: Optional[str] = None) -> List[Dict]:
         """
         Search for similar documents in the vector store.
         
@@ -185,6 +361,7 @@ class VectorStore:
             query: Query string
             collection_name: Name of the collection to search
             top_k: Number of results to return (default: 5)
+            prefilter: "bm25" to restrict dense search to the best keyword matches (optional)
             
         Returns:
             List of matching documents with similarity scores
@@ -192,10 +369,20 @@ class VectorStore:
         try:
             collection = self._get_or_create_collection(collection_name)
             
+            # Narrow the candidate chunks lexically when a keyword index is available;
+            # fall back to searching the whole collection when fewer than top_k chunks match
+            candidate_ids = None
+            keyword_index = self.keyword_indexes.get(collection_name)
+            if prefilter == "bm25" and keyword_index is not None:
+                candidate_ids = keyword_index.top_k(query, max(top_k * 10, BM25_MIN_CANDIDATES))
+                if len(candidate_ids) < top_k:
+                    candidate_ids = None
+            
             # Perform search
             results = collection.query(
                 query_texts=[query],
-                n_results=top_k
+                n_results=top_k,
+                ids=candidate_ids
             )
             
             # Format results
@@ -217,9 +404,28 @@ class VectorStore:
             logger.error(f"Error searching collection {collection_name}: {str(e)}")
             return []
     
-    def get_collections(self) -> List[str]:
-        """Get list of all collections in the database."""
-        return [col.name for col in self.client.list_collections()]
+    def collection_exists(self, collection_name: str) -> bool:
+        """Check whether a collection exists without listing all collections."""
+        if collection_name in self.collections:
+            return True
+        try:
+            self.client.get_collection(name=collection_name)
+            return True
+        except Exception:
+            return False
+    
+    def get_collections(self, limit: Optional[int] = None, offset: Optional[int] = None) -> List[str]:
+        """
+        Get list of collections in the database.
+        
+        Args:
+            limit: Maximum number of names to return (default: all)
+            offset: Number of collections to skip, for paging (optional)
+            
+        Returns:
+            List of collection names
+        """
+        return [col.name for col in self.client.list_collections(limit=limit, offset=offset)]
     
     def delete_collection(self, collection_name: str) -> bool:
         """Delete a collection from the database."""
@@ -227,6 +433,7 @@ class VectorStore:
             self.client.delete_collection(collection_name)
             if collection_name in self.collections:
                 del self.collections[collection_name]
+            self.keyword_indexes.pop(collection_name, None)
             logger.info(f"Deleted collection: {collection_name}")
             return True
         except Exception as e: